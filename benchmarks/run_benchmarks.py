@@ -0,0 +1,304 @@
+"""Headless performance benchmarks for the image pipeline.
+
+Generates a synthetic library and reports JSON timings for folder
+scanning, the image catalog, decoding (threads against the process
+pool), per-zoom rendering, study filters, simulated drag frames and
+duplicate hashing.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --files 10000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import PIL
+from PIL import Image
+
+from src.catalog import ImageCatalog
+from src.duplicates import find_clusters, hash_files
+from src.filters import apply_chain, FilterCache
+from src.image_loader import prepare_image
+from src.library_index import LibraryIndex
+from src.process_decode import ProcessDecoder
+from src.pyramid import ImagePyramid
+from src.render_core import render_view
+from src.scanner import scan_folder
+from src.viewport import render_viewport, view_covered
+
+ZOOM_PRESETS = [1.0, 1.25, 1.5, 2.0, 3.0]
+VIEWPORT_SIZE = (650, 480)
+PAN_MARGIN = 256
+FILTER_CHAINS = [("grayscale",), ("values3",), ("values5",), ("notan",), ("edges",), ("flip",),
+                 ("flip", "values5")]
+
+# (name, size, format, mode) of the large images used for decode/render timings
+LARGE_IMAGES = [
+    ("photo_24mp", (6000, 4000), "JPEG", "RGB"),
+    ("photo_12mp", (4000, 3000), "JPEG", "RGB"),
+    ("scan_alpha", (4000, 3000), "PNG", "RGBA"),
+    ("sketch_gray", (3000, 2000), "PNG", "L"),
+    ("small_gif", (800, 600), "GIF", "P"),
+]
+
+
+def synthetic_image(size, mode):
+    """Smooth gradients with some structure, so compression behaves like a photo"""
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    radial = Image.radial_gradient("L").resize(size)
+    if mode == "L":
+        return Image.blend(gradient, radial, 0.5)
+    image = Image.merge("RGB", (gradient, radial, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    if mode == "RGBA":
+        image.putalpha(radial)
+    elif mode == "P":
+        image = image.convert("P", palette=Image.ADAPTIVE)
+    return image
+
+
+def build_library(root, file_count, large_images=LARGE_IMAGES):
+    """Write many small files (for scanning) and a few large ones (for decoding)"""
+    small = os.path.join(root, "small")
+    os.makedirs(small, exist_ok=True)
+    formats = [("JPEG", ".jpg", "RGB"), ("PNG", ".png", "RGBA"), ("GIF", ".gif", "P")]
+    templates = {ext: synthetic_image((64, 48), mode) for _, ext, mode in formats}
+    # Encode each template once and copy the bytes; the scan only cares about file count
+    encoded = {}
+    for image_format, ext, _ in formats:
+        path = os.path.join(small, f"template{ext}")
+        templates[ext].save(path, image_format)
+        with open(path, "rb") as f:
+            encoded[ext] = f.read()
+        os.remove(path)
+    for i in range(file_count):
+        ext = formats[i % len(formats)][1]
+        # Spread files over subfolders like a real reference library
+        folder = os.path.join(small, f"set{i // 1000:03d}")
+        if i % 1000 == 0:
+            os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"img{i:06d}{ext}"), "wb") as f:
+            f.write(encoded[ext])
+
+    large = os.path.join(root, "large")
+    os.makedirs(large, exist_ok=True)
+    large_paths = {}
+    for name, size, image_format, mode in large_images:
+        ext = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif"}[image_format]
+        path = os.path.join(large, name + ext)
+        synthetic_image(size, mode).save(path, image_format, **({"quality": 90} if image_format == "JPEG" else {}))
+        large_paths[name] = path
+    return small, large_paths
+
+
+def timed(function, repeat):
+    """Run function repeat times and summarise the wall clock times in ms"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples), result
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def bench_scan(folder, work_dir):
+    results = {}
+    start = time.perf_counter()
+    found = sum(1 for _ in scan_folder(folder, recursive=True))
+    elapsed = time.perf_counter() - start
+    results["scan_folder"] = {"files": found, "seconds": round(elapsed, 4),
+                              "files_per_second": round(found / elapsed) if elapsed else None}
+
+    index = LibraryIndex(os.path.join(work_dir, "library.sqlite3"))
+    for label in ("index_cold", "index_warm"):
+        start = time.perf_counter()
+        found = sum(1 for _ in index.scan(folder, recursive=True))
+        elapsed = time.perf_counter() - start
+        results[label] = {"files": found, "seconds": round(elapsed, 4),
+                          "files_per_second": round(found / elapsed) if elapsed else None}
+    index.close()
+    return results
+
+
+def bench_catalog(folder, repeat):
+    """Memory and sort cost of the compact catalog against a plain list of paths"""
+    paths = list(scan_folder(folder, recursive=True))
+    list_bytes = sys.getsizeof(paths) + sum(sys.getsizeof(path) for path in paths)
+    build, catalog = timed(lambda: ImageCatalog(paths), repeat)
+    by_name, _ = timed(lambda: catalog.sort("name"), repeat)
+    by_size, _ = timed(lambda: catalog.sort("size"), repeat)
+    lookup, _ = timed(lambda: catalog.index(paths[len(paths) // 2]), repeat)
+    return {"files": len(paths), "list_bytes": list_bytes, "catalog_bytes": catalog.nbytes(),
+            "build": build, "sort_name": by_name, "sort_size": by_size, "index_lookup": lookup}
+
+
+def bench_decode(large_paths, max_dimension, repeat):
+    results = {}
+    for name, path in large_paths.items():
+        def full_decode():
+            with Image.open(path) as image:
+                image.load()
+        full, _ = timed(full_decode, repeat)
+        prepared_stats, prepared = timed(lambda: prepare_image(path, max_dimension), repeat)
+        results[name] = {"full_decode": full, "prepare_image": prepared_stats,
+                         "prepared_size": list(prepared.size)}
+    return results
+
+
+def bench_render(large_paths, max_dimension, repeat):
+    results = {}
+    for name, path in large_paths.items():
+        prepared = prepare_image(path, max_dimension)
+        pyramid = ImagePyramid(prepared)
+        # As in the app, the whole image is filtered once (timed under "filters") and cached
+        filter_cache = FilterCache()
+        render_view(pyramid, VIEWPORT_SIZE, 1.0, (0, 0), ("grayscale",), filter_cache=filter_cache, cache_key=name)
+        per_zoom = {}
+        for zoom in ZOOM_PRESETS:
+            preview, _ = timed(lambda: render_view(pyramid, VIEWPORT_SIZE, zoom, (0, 0), (),
+                                                   Image.NEAREST, PAN_MARGIN), repeat)
+            quality, _ = timed(lambda: render_view(pyramid, VIEWPORT_SIZE, zoom, (0, 0), (),
+                                                   Image.LANCZOS, PAN_MARGIN), repeat)
+            grayscale, _ = timed(lambda: render_view(pyramid, VIEWPORT_SIZE, zoom, (0, 0), ("grayscale",),
+                                                     Image.LANCZOS, PAN_MARGIN, filter_cache, name), repeat)
+            per_zoom[f"{zoom:.2f}"] = {"preview": preview, "high_quality": quality, "grayscale": grayscale}
+        results[name] = per_zoom
+    return results
+
+
+def bench_filters(large_paths, max_dimension, repeat):
+    """Cost of running each study filter once over a prepared image"""
+    results = {}
+    for name, path in large_paths.items():
+        prepared = prepare_image(path, max_dimension)
+        results[name] = {",".join(chain): timed(lambda: apply_chain(prepared, chain), repeat)[0]
+                         for chain in FILTER_CHAINS}
+    return results
+
+
+def bench_decode_backends(large_paths, max_dimension, repeat, workers=2):
+    """Every large image decoded concurrently, on threads and through the process pool"""
+    paths = list(large_paths.values())
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        threads, _ = timed(lambda: list(pool.map(lambda path: prepare_image(path, max_dimension), paths)), repeat)
+        # min_pixels=0 sends every image to the processes; the first call starts them
+        decoder = ProcessDecoder(max_dimension, workers=workers, min_pixels=0)
+        try:
+            decoder.load(paths[0])
+            processes, _ = timed(lambda: list(pool.map(decoder.load, paths)), repeat)
+            stats = decoder.stats()
+        finally:
+            decoder.shutdown()
+    return {"workers": workers, "threads": threads, "processes": processes, "process_stats": stats}
+
+
+def bench_duplicates(folder, repeat, hash_files_count=2000, cluster_sizes=(10000, 50000)):
+    """Perceptual hashing per batch of files, and grouping random hashes (no pairs compared exhaustively)"""
+    paths = list(scan_folder(folder, recursive=True))[:hash_files_count]
+    start = time.perf_counter()
+    hashed = sum(1 for value in hash_files(paths) if value is not None)
+    elapsed = time.perf_counter() - start
+    results = {"hash": {"files": hashed, "seconds": round(elapsed, 4),
+                        "files_per_second": round(hashed / elapsed) if elapsed else None}}
+    rng = random.Random(0)
+    for count in cluster_sizes:
+        hashes = {index: rng.getrandbits(64) for index in range(count)}
+        results[f"cluster_{count}"] = timed(lambda: find_clusters(hashes), repeat)[0]
+    return results
+
+
+def bench_drag(large_paths, max_dimension, frames=240, step=(9, 4)):
+    """Replay a drag at 300% zoom the way AppUI.apply_drag_frame handles it"""
+    results = {}
+    for name, path in large_paths.items():
+        pyramid = ImagePyramid(prepare_image(path, max_dimension))
+        zoom = ZOOM_PRESETS[-1]
+        pan_x = pan_y = 0
+        rendered_rect, rendered_pan = None, (0, 0)
+        samples = []
+        renders = 0
+        for frame in range(frames):
+            # Sweep right and back so the drag keeps leaving the rendered area
+            direction = 1 if (frame // 80) % 2 == 0 else -1
+            pan_x += step[0] * direction
+            pan_y += step[1] * direction
+            start = time.perf_counter()
+            if rendered_rect is None or not view_covered(rendered_rect, rendered_pan, pyramid.size,
+                                                         VIEWPORT_SIZE, zoom, pan_x, pan_y):
+                rendered, position = render_viewport(pyramid, VIEWPORT_SIZE, zoom, pan_x, pan_y,
+                                                     Image.NEAREST, margin=PAN_MARGIN)
+                if rendered is not None:
+                    rendered_rect = (position[0], position[1],
+                                     position[0] + rendered.width, position[1] + rendered.height)
+                    rendered_pan = (pan_x, pan_y)
+                    renders += 1
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = {"frame_time": summarize(samples), "frames": frames, "re_renders": renders}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=10000, help="number of small files to scan")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per timing")
+    parser.add_argument("--max-dimension", type=int, default=1920, help="display size images are prepared for")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--work-dir", help="where to build the synthetic library (kept afterwards)")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="5minsketch-bench-")
+    try:
+        small_folder, large_paths = build_library(work_dir, args.files)
+        report = {
+            "environment": {
+                "python": sys.version.split()[0],
+                "pillow": PIL.__version__,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "parameters": {"files": args.files, "repeat": args.repeat,
+                           "max_dimension": args.max_dimension, "viewport": list(VIEWPORT_SIZE)},
+            "scan": bench_scan(small_folder, work_dir),
+            "catalog": bench_catalog(small_folder, args.repeat),
+            "decode": bench_decode(large_paths, args.max_dimension, args.repeat),
+            "render": bench_render(large_paths, args.max_dimension, args.repeat),
+            "decode_backends": bench_decode_backends(large_paths, args.max_dimension, args.repeat),
+            "filters": bench_filters(large_paths, args.max_dimension, args.repeat),
+            "drag": bench_drag(large_paths, args.max_dimension),
+            "duplicates": bench_duplicates(small_folder, args.repeat),
+        }
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,95 @@
 import os
+import sys
 import time
+import functools
 import tkinter as tk
-from src.image_handler import ImageHandler
-from src.timer import Timer
-from src.ui import AppUI
+from src import instrumentation
+from src.session import load_session, save_session, preview_path
+
+# How many images to decode ahead of (and behind) the current one
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+PREFETCH_BUDGET_MB = 256
+DISPLAY_CACHE_MB = 1024
+DEFAULT_GEOMETRY = "650x600"
+# SKETCH_DECODE=process decodes huge images in worker processes (see src/process_decode.py)
+DECODE_BACKEND = os.environ.get("SKETCH_DECODE", "thread")
 
 class ImageViewerApp:
-    def __init__(self, root):
+    def __init__(self, root, session=None, startup_preview=None):
+        # The imaging stack (PIL, numpy) is imported here rather than at the top,
+        # so the window and the last session's preview are up before it loads
+        from src.image_handler import ImageHandler
+        from src.timer import Timer
+        from src.ui import AppUI
+        from src.prefetch import Prefetcher
+        from src.prefetch_scheduler import PrefetchScheduler
+        from src.disk_cache import DiskCache
+        from src.library_index import LibraryIndex
+        from src.image_loader import load_display_image, display_max_dimension
+
         self.root = root
         self.root.title("5 minute sketcher")
-        self.root.geometry("650x600")
+        if not session:
+            self.root.geometry(DEFAULT_GEOMETRY)
         
-        self.image_handler = ImageHandler()
-        self.timer = Timer()
-        self.ui = AppUI(root, self.image_handler, self.timer, self.update_image)
+        self.timer = Timer(root)
+        self.disk_cache = DiskCache(max_bytes=DISPLAY_CACHE_MB * 1024 * 1024)
+        self.library_index = LibraryIndex()
+        # Sorting by date, size or dimensions reads those from the index instead of the files
+        self.image_handler = ImageHandler(metadata_lookup=self.library_index.get_metadata_many)
+        # Decode images straight to the size needed to fill the screen
+        max_dimension = display_max_dimension(root.winfo_screenwidth(), root.winfo_screenheight())
+        self.process_decoder = None
+        if DECODE_BACKEND == "process":
+            from src.process_decode import ProcessDecoder
+            self.process_decoder = ProcessDecoder(max_dimension, disk_cache=self.disk_cache)
+            instrumentation.register_stats("process_decode", self.process_decoder.stats)
+            loader = self.process_decoder.load
+        else:
+            loader = functools.partial(load_display_image, max_dimension=max_dimension, disk_cache=self.disk_cache)
+        self.prefetcher = Prefetcher(loader=loader, budget_bytes=PREFETCH_BUDGET_MB * 1024 * 1024)
+        self.ui = AppUI(root, self.image_handler, self.timer, self.update_image, self.prefetcher,
+                        self.disk_cache, self.library_index)
+        # Decides when neighbours are decoded: straight away, or just in time for the timer
+        self.prefetch_scheduler = PrefetchScheduler(root, self.prefetcher, self.timer, self.image_handler,
+                                                    self.ui.is_interacting, self.library_index,
+                                                    ahead=PREFETCH_AHEAD, behind=PREFETCH_BEHIND)
+        instrumentation.register_stats("prefetch_schedule", self.prefetch_scheduler.stats)
 
         self.timer.set_timer_callback(self.on_timer_tick)
         
         # Bind arrow keys for navigation
         self.root.bind("<Left>", self.previous_image)
         self.root.bind("<Right>", self.next_image)
+        self.root.bind("<F3>", self.ui.toggle_hud)
 
         # If mouse wheel events aren't being properly captured
         self.root.bind_all("<MouseWheel>", self._on_mouse_wheel)
         self.root.bind_all("<Button-4>", self._on_mouse_wheel)
         self.root.bind_all("<Button-5>", self._on_mouse_wheel)
 
+        # Save the session while the widgets still exist
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        if startup_preview:
+            self.ui.show_startup_preview(*startup_preview)
+        if session:
+            self.ui.restore_session(session)
+
     def update_image(self):
         if self.image_handler.has_images():
             image_path = self.image_handler.get_current_image()
             self.ui.display_image(image_path)
+            # Plan decoding the neighbours so the next switch is instant
+            self.prefetch_scheduler.image_changed()
 
     def on_timer_tick(self, remaining_time):
+        # Called on the Tk thread; the timer re-arms itself against the next deadline
         self.ui.update_progress(remaining_time)
         if remaining_time == 0:
-            self.root.after(0, self._update_image_and_reset_timer)
-
-    def _update_image_and_reset_timer(self):
-        self.image_handler.next_image()
-        self.update_image()
-        self.timer.reset()
+            self.prefetch_scheduler.note_switch()
+            self.image_handler.next_image()
+            self.update_image()
         
     def next_image(self, event=None):
         self.image_handler.next_image()
@@ -50,13 +100,68 @@ class ImageViewerApp:
         self.update_image()
 
     def _on_mouse_wheel(self, event):
-        """Pass mouse wheel events to the UI"""
-        self.ui.on_mouse_wheel(event)
+        """Pass mouse wheel events over the image canvas to the UI"""
+        if event.widget is self.ui.canvas:
+            self.ui.on_mouse_wheel(event)
+
+    def on_close(self):
+        self.save_session()
+        self.root.destroy()
+
+    def save_session(self):
+        """Remember folder, image, timer and view, plus a preview for the next start-up"""
+        session = self.ui.session_state()
+        session["geometry"] = self.root.geometry()
+        if not self.ui.save_preview(preview_path()):
+            session["preview_position"] = None
+        save_session(session)
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.timer.stop()
+            self.prefetch_scheduler.stop()
+            self.prefetcher.shutdown()
+            if self.process_decoder:
+                self.process_decoder.shutdown()
+            self.ui.shutdown()
+            self.library_index.close()
+            trace_path = os.environ.get("SKETCH_TRACE")
+            if trace_path and instrumentation.enabled:
+                instrumentation.export_chrome_trace(trace_path)
+
+def show_startup_window(root, session):
+    """Size the window and put last session's view in it, using nothing but Tk.
+
+    Returns a placeholder canvas to destroy once the app is built, and
+    (PhotoImage, position) of the preview or None.
+    """
+    root.title("5 minute sketcher")
+    root.geometry(session.get("geometry") or DEFAULT_GEOMETRY)
+    placeholder = tk.Canvas(root, bg='black', highlightthickness=0)
+    placeholder.pack(fill=tk.BOTH, expand=True)
+    position = session.get("preview_position")
+    if not position or not os.path.exists(preview_path()):
+        return placeholder, None
+    try:
+        # Tk reads PNG itself, so this doesn't need PIL
+        photo = tk.PhotoImage(file=preview_path())
+    except tk.TclError as e:
+        print(f"Could not load session preview: {e}")
+        return placeholder, None
+    placeholder.create_image(position[0], position[1], anchor=tk.NW, image=photo)
+    return placeholder, (photo, position)
 
 if __name__ == "__main__":
+    start = time.perf_counter()
     root = tk.Tk()
-    app = ImageViewerApp(root)
+    # --fresh starts without restoring the last session
+    session = {} if "--fresh" in sys.argv[1:] else load_session()
+    placeholder, startup_preview = show_startup_window(root, session)
+    root.update()  # Paint the window now; building the app takes a while
+    instrumentation.record("startup.window", (time.perf_counter() - start) * 1000)
+    placeholder.destroy()
+    app = ImageViewerApp(root, session, startup_preview)
+    instrumentation.record("startup.ready", (time.perf_counter() - start) * 1000)
     app.run()
\ No newline at end of file
@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from PIL import Image
+
+from src.image_loader import image_size_bytes
+
+ANIMATED_EXTENSIONS = ('.gif', '.webp')
+# Decoded frames waiting for the Tk thread
+DECODE_AHEAD_FRAMES = 24
+# Frames turned into PhotoImages ahead of being shown
+READY_FRAMES = 4
+# Animations whose frames fit in this many bytes are decoded only once
+KEEP_ALL_BYTES = 64 * 1024 * 1024
+# Browsers treat tiny frame durations as "as fast as possible"; do the same as they do
+MIN_FRAME_MS = 20
+DEFAULT_FRAME_MS = 100
+
+
+def is_animated(image_path):
+    """True for GIF/WebP files with more than one frame"""
+    if not image_path.lower().endswith(ANIMATED_EXTENSIONS):
+        return False
+    try:
+        with Image.open(image_path) as image:
+            return getattr(image, 'is_animated', False)
+    except Exception:
+        return False
+
+
+def _frame_duration(image):
+    duration = image.info.get('duration') or DEFAULT_FRAME_MS
+    return DEFAULT_FRAME_MS if duration < MIN_FRAME_MS else duration
+
+
+def _flatten_frame(image, frame_size):
+    """The current frame as RGB over white, shrunk to fit frame_size"""
+    frame = image.convert('RGBA')
+    background = Image.new('RGBA', frame.size, (255, 255, 255, 255))
+    frame = Image.alpha_composite(background, frame).convert('RGB')
+    scale = min(frame_size[0] / frame.width, frame_size[1] / frame.height)
+    if scale < 1:
+        size = (max(1, round(frame.width * scale)), max(1, round(frame.height * scale)))
+        frame = frame.resize(size, Image.HAMMING, reducing_gap=1.0)
+    return frame
+
+
+class FrameDecoder:
+    """Decodes the frames of an animation in order on a background thread.
+
+    Frames are scaled to the viewport once and queued (frame, duration_ms),
+    looping forever. The queue is bounded so long animations are streamed
+    rather than held in memory; short ones are kept after the first loop.
+    """
+
+    def __init__(self, image_path, frame_size, ahead=DECODE_AHEAD_FRAMES, keep_all_bytes=KEEP_ALL_BYTES):
+        self.image_path = image_path
+        self.frame_size = frame_size
+        self.keep_all_bytes = keep_all_bytes
+        self.frames = queue.Queue(maxsize=ahead)
+        self.stop_event = threading.Event()
+        self.failed = False
+        self.thread = threading.Thread(target=self._run, name="animation", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        try:
+            with Image.open(self.image_path) as image:
+                frame_count = getattr(image, 'n_frames', 1)
+                kept = []  # Every frame so far, while they fit in keep_all_bytes
+                kept_bytes = 0
+                while not self.stop_event.is_set():
+                    if kept is not None and len(kept) == frame_count:
+                        for item in kept:
+                            if not self._put(item):
+                                return
+                        continue
+                    for index in range(frame_count):
+                        image.seek(index)
+                        item = (_flatten_frame(image, self.frame_size), _frame_duration(image))
+                        if kept is not None:
+                            kept.append(item)
+                            kept_bytes += image_size_bytes(item[0])
+                            if kept_bytes > self.keep_all_bytes:
+                                kept = None
+                        if not self._put(item):
+                            return
+        except Exception as e:
+            print(f"Error decoding animation {self.image_path}: {e}")
+            self.failed = True
+
+    def _put(self, item):
+        """Block until there is room in the queue; False once stopped"""
+        while not self.stop_event.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class AnimationPlayer:
+    """Plays decoded frames on the Tk thread with root.after and per-frame durations.
+
+    prepare(frame) turns a decoded frame into whatever show() needs (a
+    PhotoImage of the current view); a few frames are prepared ahead in
+    the idle time between frames. Deadlines are kept on time.monotonic(),
+    so slow frames don't make the animation drift.
+    """
+
+    def __init__(self, root, decoder, prepare, show, ready_frames=READY_FRAMES, poll_ms=10):
+        self.root = root
+        self.decoder = decoder
+        self.prepare = prepare
+        self.show = show
+        self.poll_ms = poll_ms
+        self.ready = deque()  # [frame, duration, prepared], at most ready_frames
+        self.ready_frames = ready_frames
+        self.current = None  # Frame on screen, kept to re-prepare it when the view changes
+        self.deadline = None
+        self.after_id = None
+
+    def start(self):
+        self.decoder.start()
+        self._tick()
+
+    def _tick(self):
+        self.after_id = None
+        self._fill()
+        if not self.ready:
+            if not self.decoder.failed:
+                self.after_id = self.root.after(self.poll_ms, self._tick)
+            return
+        frame, duration, prepared = self.ready.popleft()
+        self.current = frame
+        self.show(prepared)
+
+        now = time.monotonic()
+        if self.deadline is None or self.deadline < now - duration / 1000:
+            # First frame, or we fell far behind: restart the clock instead of rushing
+            self.deadline = now
+        self.deadline += duration / 1000
+        self.after_id = self.root.after(max(1, round((self.deadline - now) * 1000)), self._tick)
+        self._fill()
+
+    def _fill(self):
+        while len(self.ready) < self.ready_frames:
+            try:
+                frame, duration = self.decoder.frames.get_nowait()
+            except queue.Empty:
+                return
+            self.ready.append([frame, duration, self.prepare(frame)])
+
+    def refresh(self):
+        """Re-prepare everything for a new view and redraw the current frame"""
+        for entry in self.ready:
+            entry[2] = self.prepare(entry[0])
+        if self.current is not None:
+            self.show(self.prepare(self.current))
+
+    def stop(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        self.decoder.stop()
+        self.ready.clear()
@@ -0,0 +1,341 @@
+import math
+import os
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import ImageTk
+
+from src import instrumentation
+from src.filters import FilterCache
+from src.image_loader import load_display_image
+from src.progressive import BackgroundRenderer, HIGH_QUALITY_RESAMPLE, PREVIEW_RESAMPLE, UPGRADE_DELAY_MS
+from src.pyramid import ImagePyramid
+from src.render_core import render_view
+
+# Number of images on the board, as offered in the UI ("Off" is the single view)
+BOARD_SIZES = ["Off", "2", "3", "4", "6", "9"]
+CELL_GAP = 4
+
+# Cells are decoded with some headroom so zooming in keeps detail; rounding up
+# keeps the disk cache useful across small window resizes
+DECODE_DETAIL = 2
+DECODE_STEP = 256
+
+POLL_MS = 15
+
+
+def grid_shape(count, canvas_size):
+    """(columns, rows) for count cells, picking the layout with the largest square cell"""
+    width, height = canvas_size
+    best = None
+    for columns in range(1, count + 1):
+        rows = math.ceil(count / columns)
+        side = min(width / columns, height / rows)
+        # Ties go to the layout with fewer empty cells
+        score = (side, -(columns * rows - count))
+        if best is None or score > best[0]:
+            best = (score, (columns, rows))
+    return best[1]
+
+
+def cell_rects(count, canvas_size, gap=CELL_GAP):
+    """Canvas rectangles (x0, y0, x1, y1) of count cells laid out in a grid"""
+    columns, rows = grid_shape(count, canvas_size)
+    width, height = canvas_size
+    cell_width = (width - gap * (columns - 1)) / columns
+    cell_height = (height - gap * (rows - 1)) / rows
+    rects = []
+    for index in range(count):
+        row, column = divmod(index, columns)
+        x0 = round(column * (cell_width + gap))
+        y0 = round(row * (cell_height + gap))
+        rects.append((x0, y0, max(x0 + 1, round(x0 + cell_width)), max(y0 + 1, round(y0 + cell_height))))
+    return rects
+
+
+def decode_dimension(rect):
+    """Longest side to decode an image at for a cell"""
+    side = max(rect[2] - rect[0], rect[3] - rect[1]) * DECODE_DETAIL
+    return max(DECODE_STEP, math.ceil(side / DECODE_STEP) * DECODE_STEP)
+
+
+class BoardCell:
+    """One image on the board, with its own zoom and pan"""
+
+    def __init__(self, path):
+        self.path = path
+        self.future = None  # Decode in progress
+        self.dimension = None  # max_dimension the image was (or is being) decoded at
+        self.image = None
+        self.pyramid = None
+        self.failed = False
+        self.zoom_index = 0
+        self.pan_x = 0
+        self.pan_y = 0
+        self.rect = None  # Canvas rectangle of the cell
+        self.item_id = None
+        self.photo = None
+        self.key = None  # Render cache key of what is shown
+
+    @property
+    def size(self):
+        return self.rect[2] - self.rect[0], self.rect[3] - self.rect[1]
+
+    def contains(self, x, y):
+        return self.rect is not None and self.rect[0] <= x < self.rect[2] and self.rect[1] <= y < self.rect[3]
+
+
+class ReferenceBoard:
+    """Several images side by side on the canvas.
+
+    The images are decoded concurrently on a worker pool, each straight to
+    about the size of its cell. Every cell zooms and pans on its own and
+    renders only its visible part, sharing the app's render cache.
+    """
+
+    def __init__(self, root, canvas, render_cache, filter_chain, zoom_presets, disk_cache=None, workers=None,
+                 filter_cache=None):
+        self.root = root
+        self.canvas = canvas
+        self.render_cache = render_cache
+        self.filter_chain = filter_chain  # Callable returning the current filter names
+        self.filter_cache = filter_cache or FilterCache()
+        self.zoom_presets = zoom_presets
+        self.disk_cache = disk_cache
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 2),
+                                           thread_name_prefix="board")
+        self.quality_renderer = BackgroundRenderer(root, name="board-render")
+        self.cells = []
+        self.poll_id = None
+        self.upgrade_after_id = None
+        self.drag_cell = None
+        self.drag_x = 0
+        self.drag_y = 0
+        self.drag_frame_id = None
+
+    def show(self, paths):
+        """Lay out paths in a grid, keeping the view of images that were already shown"""
+        previous = {cell.path: cell for cell in self.cells}
+        self.cells = [previous.pop(path, None) or BoardCell(path) for path in paths]
+        for cell in previous.values():
+            self._forget(cell)
+        self.layout()
+
+    def layout(self):
+        """Fit the cells to the canvas, decoding any image its cell has outgrown"""
+        canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if not self.cells or canvas_size[0] <= 1 or canvas_size[1] <= 1:
+            return
+        for cell, rect in zip(self.cells, cell_rects(len(self.cells), canvas_size)):
+            cell.rect = rect
+            if not cell.failed and (cell.dimension is None or decode_dimension(rect) > cell.dimension):
+                self._decode(cell)
+        self.render_all()
+
+    def _decode(self, cell):
+        if cell.future:
+            cell.future.cancel()
+        cell.dimension = decode_dimension(cell.rect)
+        cell.future = self.executor.submit(load_display_image, cell.path, cell.dimension, self.disk_cache)
+        if not self.poll_id:
+            self.poll_id = self.root.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        """Pick up finished decodes on the Tk thread"""
+        self.poll_id = None
+        waiting = False
+        for cell in self.cells:
+            if cell.future is None:
+                continue
+            if not cell.future.done():
+                waiting = True
+                continue
+            future, cell.future = cell.future, None
+            try:
+                cell.image = future.result()
+            except Exception as e:
+                print(f"Could not show {cell.path} on the board: {e}")
+                cell.failed = True
+                continue
+            cell.pyramid = ImagePyramid(cell.image)
+            self.render_cell(cell)
+        if waiting:
+            self.poll_id = self.root.after(POLL_MS, self._poll)
+        self._schedule_upgrade()
+
+    def cell_key(self, cell):
+        """Everything about a cell's view that changes its rendered pixels"""
+        return ("board", cell.path, cell.image.size, cell.size, self.zoom_presets[cell.zoom_index],
+                cell.pan_x, cell.pan_y, self.filter_chain())
+
+    def render_all(self):
+        for cell in self.cells:
+            self.render_cell(cell)
+        self._schedule_upgrade()
+
+    def render_cell(self, cell):
+        """Show a cell's current view, reusing a cached render when there is one"""
+        if cell.rect is None:
+            return
+        if cell.image is None:
+            # Still decoding (or failed): mark out the cell
+            self._place(cell, None)
+            return
+        view_key = self.cell_key(cell)
+        for resample in (HIGH_QUALITY_RESAMPLE, PREVIEW_RESAMPLE):
+            cached = self.render_cache.get(view_key + (resample,))
+            if cached:
+                self._place(cell, view_key + (resample,), *cached)
+                return
+        key = view_key + (PREVIEW_RESAMPLE,)
+        rendered, position = render_view(cell.pyramid, cell.size, self.zoom_presets[cell.zoom_index],
+                                         (cell.pan_x, cell.pan_y), self.filter_chain(), PREVIEW_RESAMPLE,
+                                         filter_cache=self.filter_cache, cache_key=(cell.path, cell.image.size))
+        if rendered is None:
+            self._place(cell, key)  # Panned out of its cell
+            return
+        self.render_cache.put(key, rendered, position)
+        self._place(cell, key, rendered, position)
+
+    def _place(self, cell, key, rendered=None, position=None, photo=None):
+        """Replace the cell's canvas item; rendered positions are relative to the cell"""
+        if cell.item_id:
+            self.canvas.delete(cell.item_id)
+            cell.item_id = None
+        cell.key = key
+        cell.photo = None
+        with instrumentation.span("ui.canvas_update"):
+            if key is None:
+                x0, y0, x1, y1 = cell.rect
+                cell.item_id = self.canvas.create_rectangle(x0, y0, x1, y1, fill="#202020", outline="")
+            elif rendered is not None:
+                if photo is None:
+                    with instrumentation.span("ui.photoimage"):
+                        photo = ImageTk.PhotoImage(rendered)
+                    self.render_cache.set_photo(key, photo)
+                cell.photo = photo
+                cell.item_id = self.canvas.create_image(cell.rect[0] + position[0], cell.rect[1] + position[1],
+                                                        anchor=tk.NW, image=photo)
+            if cell.item_id:
+                # Below anything else, such as the performance overlay
+                self.canvas.tag_lower(cell.item_id)
+
+    def _schedule_upgrade(self):
+        if self.upgrade_after_id:
+            self.root.after_cancel(self.upgrade_after_id)
+        self.upgrade_after_id = self.root.after(UPGRADE_DELAY_MS, self.start_quality_upgrade)
+
+    def start_quality_upgrade(self):
+        """Re-render every cell still showing a preview with the high quality filter, off the Tk thread"""
+        self.upgrade_after_id = None
+        if self.drag_cell:
+            self.upgrade_after_id = self.root.after(UPGRADE_DELAY_MS, self.start_quality_upgrade)
+            return
+        chain = self.filter_chain()
+        # The job gets copies of each cell's view, never the cells' live state
+        jobs = [(cell, self.cell_key(cell), cell.pyramid, (cell.path, cell.image.size), cell.size,
+                 self.zoom_presets[cell.zoom_index], (cell.pan_x, cell.pan_y)) for cell in self.cells
+                if cell.image is not None and cell.key and cell.key[-1] != HIGH_QUALITY_RESAMPLE]
+        if not jobs:
+            return
+
+        def job():
+            results = []
+            for cell, view_key, pyramid, image_key, size, zoom, pan in jobs:
+                rendered, position = render_view(pyramid, size, zoom, pan, chain, HIGH_QUALITY_RESAMPLE,
+                                                 filter_cache=self.filter_cache, cache_key=image_key)
+                if rendered is not None:
+                    results.append((cell, view_key, rendered, position))
+            return results
+
+        def swap_in(results):
+            for cell, view_key, rendered, position in results:
+                key = view_key + (HIGH_QUALITY_RESAMPLE,)
+                self.render_cache.put(key, rendered, position)
+                # Only cells whose view didn't change while rendering
+                if cell in self.cells and cell.image is not None and self.cell_key(cell) == view_key:
+                    self._place(cell, key, rendered, position)
+
+        self.quality_renderer.submit(job, swap_in)
+
+    def cell_at(self, x, y):
+        for cell in self.cells:
+            if cell.contains(x, y):
+                return cell
+        return None
+
+    def on_mouse_wheel(self, event):
+        """Zoom the cell under the pointer, keeping the point under it still"""
+        cell = self.cell_at(event.x, event.y)
+        if cell is None or cell.image is None:
+            return
+        old_zoom = self.zoom_presets[cell.zoom_index]
+        if event.num == 5 or event.delta < 0:
+            cell.zoom_index = max(0, cell.zoom_index - 1)
+        elif event.num == 4 or event.delta > 0:
+            cell.zoom_index = min(len(self.zoom_presets) - 1, cell.zoom_index + 1)
+        zoom = self.zoom_presets[cell.zoom_index]
+        if zoom == 1.0:
+            cell.pan_x = cell.pan_y = 0
+        else:
+            width, height = cell.size
+            mouse_x = event.x - cell.rect[0] - (width // 2 + cell.pan_x)
+            mouse_y = event.y - cell.rect[1] - (height // 2 + cell.pan_y)
+            cell.pan_x += mouse_x - mouse_x * zoom / old_zoom
+            cell.pan_y += mouse_y - mouse_y * zoom / old_zoom
+        self.render_cell(cell)
+        self._schedule_upgrade()
+
+    def on_drag_start(self, event):
+        self.drag_cell = self.cell_at(event.x, event.y)
+        self.drag_x, self.drag_y = event.x, event.y
+
+    def on_drag_motion(self, event):
+        """Pan the cell the drag started in"""
+        cell = self.drag_cell
+        if cell is None or cell.image is None:
+            return
+        cell.pan_x += event.x - self.drag_x
+        cell.pan_y += event.y - self.drag_y
+        self.drag_x, self.drag_y = event.x, event.y
+        # At most one render per frame
+        if not self.drag_frame_id:
+            self.drag_frame_id = self.root.after(16, self._apply_drag_frame, cell)
+
+    def _apply_drag_frame(self, cell):
+        self.drag_frame_id = None
+        if cell in self.cells:
+            self.render_cell(cell)
+
+    def on_drag_end(self, event):
+        if self.drag_frame_id:
+            self.root.after_cancel(self.drag_frame_id)
+            self._apply_drag_frame(self.drag_cell)
+        self.drag_cell = None
+        self._schedule_upgrade()
+
+    def _forget(self, cell):
+        if cell.future:
+            cell.future.cancel()
+        if cell.item_id:
+            self.canvas.delete(cell.item_id)
+
+    def stop(self):
+        """Take the board off the canvas and drop pending work"""
+        for cell in self.cells:
+            self._forget(cell)
+        self.cells = []
+        self.quality_renderer.cancel()
+        for after_id in (self.poll_id, self.upgrade_after_id, self.drag_frame_id):
+            if after_id:
+                self.root.after_cancel(after_id)
+        self.poll_id = self.upgrade_after_id = self.drag_frame_id = None
+
+    def shutdown(self):
+        """Stop background work; runs after the window is destroyed, so the canvas is left alone"""
+        for cell in self.cells:
+            if cell.future:
+                cell.future.cancel()
+        self.cells = []
+        self.quality_renderer.shutdown()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,184 @@
+import tkinter as tk
+
+from PIL import ImageTk
+
+from src.thumbnails import THUMBNAIL_SIZE
+
+CELL_PADDING = 8
+CELL_SIZE = THUMBNAIL_SIZE + CELL_PADDING
+# Rows below the view whose thumbnails are made once the visible ones are done
+PREFETCH_ROWS = 3
+REDRAW_MS = 16
+POLL_MS = 50
+CURRENT_OUTLINE = "#e0a030"
+
+
+class ThumbnailBrowser:
+    """Scrollable grid of thumbnails for every listed image.
+
+    Scrolling is virtual: the canvas is one screen tall and only the cells
+    in view have canvas items (and PhotoImages), placed relative to
+    scroll_y. A listing of 50k images costs the same as one screen of it.
+    """
+
+    def __init__(self, parent, root, image_handler, thumbnails, on_select):
+        self.root = root
+        self.image_handler = image_handler
+        self.thumbnails = thumbnails
+        self.on_select = on_select  # Called with the position of a clicked image
+
+        self.scrollbar = tk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(parent, bg='#101010', highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.scroll_y = 0
+        self.cells = {}  # position -> [file id, path, frame item, image item or None, photo]
+        self.visible = False
+        self.redraw_id = None
+        self.poll_id = None
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-4>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-5>", self.on_mouse_wheel)
+        self.canvas.bind("<ButtonRelease-1>", self.on_click)
+
+    def columns(self):
+        return max(1, self.canvas.winfo_width() // CELL_SIZE)
+
+    def content_height(self):
+        rows = -(-len(self.image_handler.images) // self.columns())
+        return rows * CELL_SIZE
+
+    def show(self):
+        """The tab was opened: bring the current image into view"""
+        self.visible = True
+        if self.image_handler.has_images():
+            row = self.image_handler.current_image_index // self.columns()
+            top, bottom = row * CELL_SIZE, (row + 1) * CELL_SIZE
+            if top < self.scroll_y or bottom > self.scroll_y + self.canvas.winfo_height():
+                self.scroll_y = top - (self.canvas.winfo_height() - CELL_SIZE) // 2
+        self.scroll_to(self.scroll_y)
+
+    def hide(self):
+        """The tab was left: stop making thumbnails nobody sees"""
+        self.visible = False
+        self.thumbnails.request([])
+        for position in list(self.cells):
+            self._remove(position)
+
+    def refresh(self):
+        """The listing changed (images found, sorted or removed)"""
+        if self.visible:
+            self.scroll_to(self.scroll_y)
+
+    def scroll_to(self, y):
+        self.scroll_y = max(0, min(int(y), self.content_height() - self.canvas.winfo_height()))
+        self.schedule_redraw()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.content_height())
+        elif action == "scroll":
+            step = self.canvas.winfo_height() - CELL_SIZE if unit == "pages" else CELL_SIZE
+            self.scroll_to(self.scroll_y + int(amount) * max(CELL_SIZE, step))
+
+    def on_mouse_wheel(self, event):
+        if event.num == 5 or event.delta < 0:
+            self.scroll_to(self.scroll_y + CELL_SIZE)
+        elif event.num == 4 or event.delta > 0:
+            self.scroll_to(self.scroll_y - CELL_SIZE)
+        # Keep the app-wide binding from zooming the hidden main view
+        return "break"
+
+    def on_click(self, event):
+        column = event.x // CELL_SIZE
+        if column >= self.columns():
+            return
+        position = (event.y + self.scroll_y) // CELL_SIZE * self.columns() + column
+        if position < len(self.image_handler.images):
+            self.on_select(position)
+
+    def schedule_redraw(self):
+        # Scroll and resize events are coalesced into one redraw per frame
+        if self.visible and not self.redraw_id:
+            self.redraw_id = self.root.after(REDRAW_MS, self.redraw)
+
+    def redraw(self):
+        """Create items for cells that came into view and drop the ones that left"""
+        self.redraw_id = None
+        images = self.image_handler.images
+        count = len(images)
+        columns = self.columns()
+        height = self.canvas.winfo_height()
+        first = self.scroll_y // CELL_SIZE * columns
+        end = min(count, ((self.scroll_y + height) // CELL_SIZE + 1) * columns)
+
+        for position in list(self.cells):
+            if not first <= position < end:
+                self._remove(position)
+        current = self.image_handler.current_image_index
+        wanted = []
+        for position in range(first, end):
+            # Compared by catalog id, so cells that stay in view never decode their path again
+            file_id = images.order[position]
+            cell = self.cells.get(position)
+            if cell is not None and cell[0] != file_id:
+                self._remove(position)  # The listing changed under this cell
+                cell = None
+            row, column = divmod(position, columns)
+            x = column * CELL_SIZE + CELL_PADDING // 2
+            y = row * CELL_SIZE - self.scroll_y + CELL_PADDING // 2
+            if cell is None:
+                frame = self.canvas.create_rectangle(x, y, x + THUMBNAIL_SIZE, y + THUMBNAIL_SIZE,
+                                                     fill="#202020", outline="")
+                cell = self.cells[position] = [file_id, images.path(file_id), frame, None, None]
+                self._set_thumbnail(position)
+            else:
+                self.canvas.coords(cell[2], x, y, x + THUMBNAIL_SIZE, y + THUMBNAIL_SIZE)
+                if cell[3]:
+                    self.canvas.coords(cell[3], x + THUMBNAIL_SIZE // 2, y + THUMBNAIL_SIZE // 2)
+            self.canvas.itemconfig(cell[2], outline=CURRENT_OUTLINE if position == current else "")
+            if cell[3] is None:
+                wanted.append(cell[1])
+
+        # Visible thumbnails first, then the rows just below the view
+        ahead = range(end, min(count, end + PREFETCH_ROWS * columns))
+        self.thumbnails.request(wanted + [images[position] for position in ahead])
+        if self.thumbnails.pending() and not self.poll_id:
+            self.poll_id = self.root.after(POLL_MS, self._poll)
+
+        total = max(1, self.content_height())
+        self.scrollbar.set(self.scroll_y / total, min(1.0, (self.scroll_y + height) / total))
+
+    def _set_thumbnail(self, position):
+        """Put the thumbnail on a cell if it is in memory"""
+        cell = self.cells[position]
+        thumbnail = self.thumbnails.get(cell[1])
+        if thumbnail is None:
+            return
+        x0, y0, _, _ = self.canvas.coords(cell[2])
+        cell[4] = ImageTk.PhotoImage(thumbnail)
+        cell[3] = self.canvas.create_image(x0 + THUMBNAIL_SIZE // 2, y0 + THUMBNAIL_SIZE // 2,
+                                           anchor=tk.CENTER, image=cell[4])
+
+    def _poll(self):
+        """Show thumbnails made in the background for cells still in view"""
+        self.poll_id = None
+        if not self.visible:
+            return
+        # Checked first, so thumbnails finishing meanwhile are picked up next time
+        pending = self.thumbnails.pending()
+        finished = set(self.thumbnails.take_finished())
+        for position, cell in list(self.cells.items()):
+            if cell[3] is None and cell[1] in finished:
+                self._set_thumbnail(position)
+        if pending:
+            self.poll_id = self.root.after(POLL_MS, self._poll)
+
+    def _remove(self, position):
+        cell = self.cells.pop(position)
+        self.canvas.delete(cell[2])
+        if cell[3]:
+            self.canvas.delete(cell[3])
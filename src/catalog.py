@@ -0,0 +1,219 @@
+import os
+import sys
+from array import array
+
+from src.image_loader import read_image_info
+
+SORT_KEYS = ("name", "mtime", "size", "dimensions")
+METADATA_CHUNK = 500
+
+
+class ImageCatalog:
+    """Image paths stored compactly, listed in a chosen order.
+
+    Each directory is stored once and file names are packed as UTF-8 into
+    one buffer with integer offsets, so a path costs a few dozen bytes
+    instead of a full Python string. Files get ids in the order they are
+    added; the display order is an array of ids, so sorting never moves
+    any strings. Indexing and iterating give paths in display order, like
+    the plain list this replaces.
+    """
+
+    def __init__(self, paths=()):
+        self.directories = []  # dir id -> directory path
+        self.directory_ids = {}  # directory path -> dir id
+        self.names = bytearray()  # NUL terminated file names, back to back
+        self.name_offsets = array('I')  # file id -> start of its name in names
+        self.file_directories = array('I')  # file id -> dir id
+        self.order = array('I')  # position -> file id
+        # Sort values by file id, filled for ids below len(...) by load_metadata
+        self.mtimes = array('q')
+        self.sizes = array('q')
+        self.pixel_counts = array('q')
+        self.directory_ranks = array('I')  # dir id -> position of the folder in tree order
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, position):
+        return self.path(self.order[position])
+
+    def __iter__(self):
+        return (self.path(file_id) for file_id in self.order)
+
+    def __delitem__(self, position):
+        # The packed name stays behind; only the listing changes
+        del self.order[position]
+
+    def path(self, file_id):
+        directory = self.directories[self.file_directories[file_id]]
+        return os.path.join(directory, os.fsdecode(self._name(file_id)))
+
+    def _name(self, file_id):
+        start = self.name_offsets[file_id]
+        return bytes(self.names[start:self.names.index(0, start)])
+
+    def _add_all(self, paths):
+        """Pack paths and return their new file ids (not listed yet)"""
+        first_id = len(self.name_offsets)
+        directory_ids = self.directory_ids
+        split, encode = os.path.split, os.fsencode
+        name_offsets, file_directories, names = self.name_offsets, self.file_directories, self.names
+        for path in paths:
+            directory, name = split(path)
+            directory_id = directory_ids.get(directory)
+            if directory_id is None:
+                directory_id = directory_ids[directory] = len(self.directories)
+                self.directories.append(directory)
+            name_offsets.append(len(names))
+            file_directories.append(directory_id)
+            names += encode(name)
+            names.append(0)
+        return range(first_id, len(name_offsets))
+
+    def extend(self, paths):
+        """Append paths to the end of the listing"""
+        self.order.extend(self._add_all(paths))
+
+    def add_sorted(self, paths, key="name", metadata_lookup=None):
+        """Add paths, keeping a listing that is already sorted by key in order"""
+        file_ids = self._add_all(paths)
+        if not file_ids:
+            return
+        if key != "name":
+            self.load_metadata(metadata_lookup)
+        new_order = self._sorted(file_ids, key)
+        sort_key = self._key_function(key)
+        if self.order and sort_key(new_order[0]) < sort_key(self.order[-1]):
+            # Binary search each new file's place, so only a few keys per new file are
+            # computed instead of decoding and sorting the whole listing every batch
+            order = self.order
+            merged = array('I')
+            start = 0
+            for file_id in new_order:
+                value = sort_key(file_id)
+                low, high = start, len(order)
+                while low < high:
+                    middle = (low + high) // 2
+                    if value < sort_key(order[middle]):
+                        high = middle
+                    else:
+                        low = middle + 1
+                merged.extend(order[start:low])
+                merged.append(file_id)
+                start = low
+            merged.extend(order[start:])
+            self.order = merged
+        else:
+            # Folders are scanned in name order, so new files usually go at the end
+            self.order.extend(new_order)
+
+    def file_id(self, path):
+        """Id of the file at path, or None if it was never added"""
+        directory, name = os.path.split(path)
+        directory_id = self.directory_ids.get(directory)
+        if directory_id is None:
+            return None
+        needle = os.fsencode(name) + b'\0'
+        start = self.names.find(needle)
+        while start != -1:
+            # A match has to be a whole name (preceded by a NUL or at the start)
+            if start == 0 or self.names[start - 1] == 0:
+                file_id = self._id_at_offset(start)
+                if self.file_directories[file_id] == directory_id:
+                    return file_id
+            start = self.names.find(needle, start + 1)
+        return None
+
+    def _id_at_offset(self, offset):
+        low, high = 0, len(self.name_offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self.name_offsets[middle] < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def index(self, path):
+        """Position of path in the listing; ValueError if it isn't listed"""
+        file_id = self.file_id(path)
+        if file_id is None:
+            raise ValueError(f"{path} is not in the catalog")
+        return self.order.index(file_id)
+
+    def _ranks(self):
+        """Folders in tree order (a folder's files before its subfolders), as dir id -> rank"""
+        if len(self.directory_ranks) != len(self.directories):
+            ranked = sorted(range(len(self.directories)), key=lambda d: self.directories[d].split(os.sep))
+            self.directory_ranks = array('I', [0]) * len(ranked)
+            for rank, directory_id in enumerate(ranked):
+                self.directory_ranks[directory_id] = rank
+        return self.directory_ranks
+
+    def _key_function(self, key):
+        """Function from file id to its sort key, for a handful of files"""
+        if key != "name":
+            return {"mtime": self.mtimes, "size": self.sizes, "dimensions": self.pixel_counts}[key].__getitem__
+        ranks, file_directories = self._ranks(), self.file_directories
+        return lambda file_id: (ranks[file_directories[file_id]], os.fsdecode(self._name(file_id)))
+
+    def _sorted(self, file_ids, key):
+        """file_ids as an array sorted by key (name, mtime, size or dimensions)"""
+        if key != "name" or len(file_ids) * 8 < len(self.name_offsets):
+            return array('I', sorted(file_ids, key=self._key_function(key)))
+        # Many files: decode all names at once and sort twice with plain lookups as keys,
+        # by name and then (stable) by folder; str keys also get list.sort's fast compare
+        names = os.fsdecode(bytes(self.names)).split('\0')
+        ranks = self._ranks()
+        file_ranks = array('I', [ranks[d] for d in self.file_directories])
+        order = sorted(file_ids, key=names.__getitem__)
+        order.sort(key=file_ranks.__getitem__)
+        return array('I', order)
+
+    def sort(self, key="name", metadata_lookup=None):
+        """Reorder the listing by name, mtime, size or dimensions (pixel count)"""
+        order = self._sorted(self.order, "name")
+        if key != "name":
+            # Stable, so equal values stay in name order
+            self.load_metadata(metadata_lookup)
+            order = self._sorted(order, key)
+        self.order = order
+
+    def load_metadata(self, metadata_lookup=None):
+        """Fill in sort values for files that don't have them yet.
+
+        metadata_lookup(paths) returns {path: {'mtime_ns', 'size', 'width',
+        'height', ...}} (LibraryIndex.get_metadata_many); anything it
+        doesn't know is read from the file system.
+        """
+        total = len(self.name_offsets)
+        for start in range(len(self.mtimes), total, METADATA_CHUNK):
+            paths = [self.path(file_id) for file_id in range(start, min(total, start + METADATA_CHUNK))]
+            known = metadata_lookup(paths) if metadata_lookup else {}
+            for path in paths:
+                metadata = known.get(path)
+                if metadata is None:
+                    metadata = _read_metadata(path)
+                self.mtimes.append(metadata.get('mtime_ns') or 0)
+                self.sizes.append(metadata.get('size') or 0)
+                self.pixel_counts.append((metadata.get('width') or 0) * (metadata.get('height') or 0))
+
+    def nbytes(self):
+        """Approximate memory used, for comparing against a list of path strings"""
+        arrays = (self.name_offsets, self.file_directories, self.order, self.mtimes, self.sizes, self.pixel_counts)
+        return (len(self.names) + sum(a.itemsize * len(a) for a in arrays)
+                + sum(sys.getsizeof(d) for d in self.directories) + sys.getsizeof(self.directory_ids))
+
+
+def _read_metadata(path):
+    metadata = {}
+    try:
+        stat = os.stat(path)
+        metadata['mtime_ns'] = stat.st_mtime_ns
+        metadata['size'] = stat.st_size
+        metadata.update(read_image_info(path))
+    except Exception as e:
+        print(f"Could not read metadata for {path}: {e}")
+    return metadata
@@ -0,0 +1,178 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import uuid
+from PIL import Image
+
+from src.session import default_cache_dir
+
+# Raw file layout: fixed size header followed by the uncompressed pixel rows
+HEADER_FORMAT = "<8s4sII"
+# Version 2 stores images upright (EXIF orientation applied); older entries read as misses
+HEADER_MAGIC = b"5MSKRAW2"
+HEADER_SIZE = 64  # Padded so the pixel data starts on an aligned offset
+
+# Modes PIL can wrap around a buffer without copying (RGB is padded to RGBX)
+STORED_MODES = {"L": "L", "RGB": "RGBX"}
+
+
+class DiskCache:
+    """Content addressed on-disk cache of display sized images.
+
+    Entries are stored as raw pixels so a cache hit is a memory map of the
+    file wrapped as a PIL image, with no decoding involved.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(default_cache_dir(), "display")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total_bytes = None  # Computed lazily from the directory contents
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, image_path, target_size):
+        stat = os.stat(image_path)
+        ident = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{target_size}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".raw")
+
+    def get(self, image_path, target_size):
+        """Return the cached image for this file and size, or None"""
+        try:
+            entry_path = self._entry_path(self._key(image_path, target_size))
+            with open(entry_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if len(mapped) < HEADER_SIZE:
+            return self._drop_entry(entry_path, mapped)
+        magic, mode, width, height = struct.unpack_from(HEADER_FORMAT, mapped)
+        if magic != HEADER_MAGIC:
+            mapped.close()
+            self.misses += 1
+            return None
+        mode = mode.rstrip(b"\0").decode("ascii", "replace")
+        if (mode not in STORED_MODES.values() or width <= 0 or height <= 0
+                or len(mapped) < HEADER_SIZE + width * height * len(mode)):
+            # Truncated or corrupt (an interrupted copy, a full disk): a miss, not a bad image
+            return self._drop_entry(entry_path, mapped)
+
+        # Image memory points straight into the mapping (it keeps the mapping alive)
+        image = Image.frombuffer(mode, (width, height), memoryview(mapped)[HEADER_SIZE:],
+                                 "raw", mode, 0, 1)
+        self.hits += 1
+        # Touch the entry so eviction is least recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return image
+
+    def _drop_entry(self, entry_path, mapped):
+        """Delete an unusable entry and count the lookup as a miss"""
+        mapped.close()
+        self.misses += 1
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+        return None
+
+    def put(self, image_path, target_size, image):
+        """Store a prepared image; silently skipped for unsupported modes"""
+        # Images that are already in a stored mode (cache hits, process decodes) go in as they are
+        stored_mode = STORED_MODES.get(image.mode, image.mode)
+        if stored_mode not in STORED_MODES.values():
+            return
+        if image.mode != stored_mode:
+            image = image.convert(stored_mode)
+
+        temp_path = None
+        try:
+            entry_path = self._entry_path(self._key(image_path, target_size))
+            header = struct.pack(HEADER_FORMAT, HEADER_MAGIC, stored_mode.encode("ascii"),
+                                 image.width, image.height).ljust(HEADER_SIZE, b"\0")
+            data = image.tobytes()
+            # Write to a temporary name first so readers never see a partial file
+            temp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(header)
+                f.write(data)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            print(f"Could not write display cache entry for {image_path}: {e}")
+            if temp_path is not None:
+                # Not a .raw file, so eviction and clear() would never find it
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return
+
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += HEADER_SIZE + len(data)
+        self._evict_if_needed()
+
+    def _entries(self):
+        """(path, size, last use) for every cache file"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".raw"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict_if_needed(self):
+        with self.lock:
+            if self.total_bytes is not None and self.total_bytes <= self.max_bytes:
+                return
+            entries = self._entries()
+            self.total_bytes = sum(size for _, size, _ in entries)
+            if self.total_bytes <= self.max_bytes:
+                return
+            # Oldest first; stop once we are comfortably under the limit
+            for path, size, _ in sorted(entries, key=lambda e: e[2]):
+                if self.total_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                    self.total_bytes -= size
+                except OSError:
+                    pass  # Still mapped on Windows, or already gone
+
+    def counters(self):
+        """Hit/miss counts (cheap, unlike stats())"""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def stats(self):
+        """Summary of the cache contents"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        with self.lock:
+            self.total_bytes = total
+        return {"entries": len(entries), "bytes": total, "max_bytes": self.max_bytes,
+                "path": self.cache_dir}
+
+    def clear(self):
+        """Delete every cache entry"""
+        with self.lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_bytes = None
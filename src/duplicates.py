@@ -0,0 +1,196 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from src import instrumentation
+from src.filters import import_numpy
+from src.image_loader import grey_to_8bit, header_orientation, ORIENTATION_TRANSPOSE
+
+# dHash compares neighbouring pixels of a 9x8 grey thumbnail: 64 bits
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+# Images within this many differing bits are treated as copies of each other
+DUPLICATE_DISTANCE = 5
+# Hashes with fewer set bits are too flat (blank pages, solid fills) to compare
+MIN_HASH_BITS = 4
+HASH_BATCH = 64
+# Fewer files than this are hashed on the finder thread; a process pool doesn't pay off
+PROCESS_MIN_FILES = 256
+
+def tiny_gray(image_path):
+    """The image as a HASH_WIDTH x HASH_HEIGHT grey thumbnail, upright, decoded as little as possible"""
+    with Image.open(image_path) as image:
+        orientation = header_orientation(image)
+        # JPEG decodes at 1/8 scale; other formats decode in full but are reduced at once
+        image.draft('L', (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+        if image.mode in ('I', 'F') or image.mode.startswith('I;16'):
+            image = grey_to_8bit(image)
+        small = image.convert('L').resize((32, 32), Image.BOX, reducing_gap=2.0)
+    if orientation in ORIENTATION_TRANSPOSE:
+        small = small.transpose(ORIENTATION_TRANSPOSE[orientation])
+    return small.resize((HASH_WIDTH, HASH_HEIGHT), Image.BOX)
+
+
+def dhash_batch(pixels):
+    """64-bit dHashes of an (n, HASH_HEIGHT, HASH_WIDTH) uint8 array, as Python ints"""
+    np = import_numpy()
+    brighter = pixels[:, :, 1:] > pixels[:, :, :-1]
+    packed = np.packbits(brighter.reshape(len(pixels), -1), axis=1)
+    return packed.view('>u8').ravel().tolist()
+
+
+def hash_files(image_paths):
+    """dHash of each path (None where the file can't be read); runs in worker processes"""
+    np = import_numpy()
+    thumbnails = []
+    readable = []
+    for path in image_paths:
+        try:
+            thumbnails.append(np.asarray(tiny_gray(path), dtype=np.uint8))
+            readable.append(True)
+        except Exception:
+            readable.append(False)
+    hashes = iter(dhash_batch(np.stack(thumbnails)) if thumbnails else [])
+    return [next(hashes) if ok else None for ok in readable]
+
+
+def _popcount(values):
+    """Set bits of each uint64 in values"""
+    np = import_numpy()
+    table = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def near_pairs(values, max_distance=DUPLICATE_DISTANCE):
+    """Index pairs (i, j) of hashes in a uint64 array at most max_distance bits apart.
+
+    The 64 bits are split into max_distance + 1 bands; by the pigeonhole
+    principle two hashes that close agree exactly on at least one band.
+    Sorting by each band puts those candidates next to each other, so only
+    they are compared instead of every pair.
+    """
+    np = import_numpy()
+    edges = np.linspace(0, 64, max_distance + 2).astype(int)
+    lefts, rights = [], []
+    for low, high in zip(edges[:-1], edges[1:]):
+        band = (values >> np.uint64(low)) & np.uint64((1 << int(high - low)) - 1)
+        order = np.argsort(band, kind='stable')
+        band = band[order]
+        # Compare each hash with the ones 1, 2, ... places further on while the band still matches
+        for offset in range(1, len(band)):
+            same = np.nonzero(band[offset:] == band[:-offset])[0]
+            if not len(same):
+                break
+            left, right = order[same], order[same + offset]
+            close = _popcount(values[left] ^ values[right]) <= max_distance
+            lefts.append(left[close])
+            rights.append(right[close])
+    if not lefts:
+        return []
+    return zip(np.concatenate(lefts).tolist(), np.concatenate(rights).tolist())
+
+
+def find_clusters(hashes, max_distance=DUPLICATE_DISTANCE):
+    """Groups of keys whose hashes are near each other (directly or through a chain).
+
+    hashes maps any key (a path) to its hash; only groups of two or more
+    are returned.
+    """
+    np = import_numpy()
+    keys = [key for key, value in hashes.items() if bin(value).count("1") >= MIN_HASH_BITS]
+    values = np.array([hashes[key] for key in keys], dtype=np.uint64)
+    parent = list(range(len(keys)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for first, second in near_pairs(values, max_distance):
+        root, other_root = find(first), find(second)
+        if root != other_root:
+            parent[other_root] = root
+
+    groups = {}
+    for index, key in enumerate(keys):
+        groups.setdefault(find(index), []).append(key)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+class DuplicateFinder:
+    """Hashes a listing on a background thread and picks the copies to hide.
+
+    Hashes stored in the library index are reused; the rest are computed
+    in batches (on a process pool for big folders) and stored. Each group
+    of near-duplicates keeps its largest image.
+    """
+
+    def __init__(self, paths, library_index=None, workers=2):
+        self.paths = paths
+        self.library_index = library_index
+        self.workers = workers
+        self.stop_event = threading.Event()
+        self.done = False
+        self.hidden = set()  # Paths to skip
+        self.groups = 0
+        self.hashed = 0  # Files hashed by this run (not served from the index)
+        self.thread = threading.Thread(target=self._run, name="duplicates", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        try:
+            with instrumentation.span("duplicates.find", files=len(self.paths)):
+                hashes = self._hashes()
+                if hashes is None:
+                    return
+                clusters = find_clusters(hashes)
+                pixels = self.library_index.get_metadata_many(
+                    [path for group in clusters for path in group]) if self.library_index else {}
+                order = {path: position for position, path in enumerate(self.paths)}
+                for group in clusters:
+                    # Keep the biggest copy, the first listed one among equals
+                    def quality(path):
+                        metadata = pixels.get(path) or {}
+                        return (metadata.get('width') or 0) * (metadata.get('height') or 0), -order[path]
+                    keep = max(group, key=quality)
+                    self.hidden.update(path for path in group if path != keep)
+                self.groups = len(clusters)
+        except Exception as e:
+            print(f"Duplicate search failed: {e}")
+        finally:
+            self.done = True
+
+    def _hashes(self):
+        """Hash of every readable path, None if stopped"""
+        hashes = self.library_index.get_hashes(self.paths) if self.library_index else {}
+        missing = [path for path in self.paths if path not in hashes]
+        batches = [missing[start:start + HASH_BATCH] for start in range(0, len(missing), HASH_BATCH)]
+        if len(missing) < PROCESS_MIN_FILES:
+            results = map(hash_files, batches)
+            executor = None
+        else:
+            # spawn, as in process_decode: forking a process running Tk and threads isn't safe
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+            results = executor.map(hash_files, batches)
+        try:
+            for batch, batch_hashes in zip(batches, results):
+                if self.stop_event.is_set():
+                    return None
+                new = {path: value for path, value in zip(batch, batch_hashes) if value is not None}
+                hashes.update(new)
+                self.hashed += len(new)
+                if self.library_index:
+                    self.library_index.set_hashes(new)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return hashes
+
+    def stop(self):
+        self.stop_event.set()
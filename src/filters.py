@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from src.image_loader import image_size_bytes
+
+# numpy is imported on first use, keeping it out of start-up
+np = None
+
+
+def import_numpy():
+    """The numpy module, imported on first use (shared with other numpy users such as duplicates)"""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _flip(pixels):
+    return pixels[:, ::-1]
+
+
+def _grayscale(pixels):
+    # Conversion to a single channel already happened when the chain started
+    return pixels
+
+
+def _value_bands(count):
+    """Posterize to count evenly spaced greys, black and white included"""
+    def posterize(pixels):
+        bands = (np.arange(256) * count) >> 8
+        lut = np.round(bands * 255 / (count - 1)).astype(np.uint8)
+        return lut[pixels]
+    return posterize
+
+
+def _notan(pixels):
+    """Two values, split at the image's average value"""
+    return np.where(pixels > pixels.mean(), np.uint8(255), np.uint8(0))
+
+
+def _edges(pixels):
+    """Sobel gradient magnitude, drawn as dark lines on white"""
+    values = pixels.astype(np.int16)
+    padded = np.pad(values, 1, mode="edge")
+    gx = (padded[:-2, 2:] + 2 * padded[1:-1, 2:] + padded[2:, 2:]
+          - padded[:-2, :-2] - 2 * padded[1:-1, :-2] - padded[2:, :-2])
+    gy = (padded[2:, :-2] + 2 * padded[2:, 1:-1] + padded[2:, 2:]
+          - padded[:-2, :-2] - 2 * padded[:-2, 1:-1] - padded[:-2, 2:])
+    magnitude = np.abs(gx) + np.abs(gy)
+    # Normalise against the strong edges; a sparse sample is plenty for the percentile
+    scale = 255.0 / max(1.0, float(np.percentile(magnitude[::4, ::4], 99)))
+    return (255 - np.clip(magnitude * scale, 0, 255)).astype(np.uint8)
+
+
+# name -> (function over a pixel array, whether it works on a single grey channel)
+FILTERS = {
+    "flip": (_flip, False),
+    "grayscale": (_grayscale, True),
+    "values3": (_value_bands(3), True),
+    "values5": (_value_bands(5), True),
+    "notan": (_notan, True),
+    "edges": (_edges, True),
+}
+
+# Study modes offered in the UI, in display order
+STUDY_MODES = OrderedDict([
+    ("None", None),
+    ("3 values", "values3"),
+    ("5 values", "values5"),
+    ("Notan", "notan"),
+    ("Edges", "edges"),
+])
+
+
+def apply_chain(image, filter_chain):
+    """Run a chain of named filters over an image's pixels.
+
+    Chains containing any tonal filter are processed as a single 'L'
+    channel from the start, a third of the memory of RGB.
+    """
+    if not filter_chain:
+        return image
+    import_numpy()
+    grayscale = any(FILTERS[name][1] for name in filter_chain)
+    pixels = np.asarray(image.convert("L") if grayscale else image.convert("RGB"))
+    for name in filter_chain:
+        pixels = FILTERS[name][0](pixels)
+    return Image.fromarray(np.ascontiguousarray(pixels))
+
+
+class FilterCache:
+    """LRU of filtered display-resolution images, keyed on (image, chain), bounded in bytes"""
+
+    def __init__(self, budget_bytes=192 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()  # key -> (value, size_bytes)
+        self.total_bytes = 0
+        self.lock = threading.Lock()  # High quality renders look entries up from a worker thread
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, image):
+        """Store value (e.g. a pyramid) whose memory is dominated by image"""
+        size_bytes = image_size_bytes(image)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self.entries[key] = (value, size_bytes)
+            self.total_bytes += size_bytes
+            while self.total_bytes > self.budget_bytes and len(self.entries) > 1:
+                _, (_, evicted_bytes) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
@@ -1,27 +1,73 @@
-import os
-import random
-from PIL import Image
+from src import instrumentation
+from src.catalog import ImageCatalog
+from src.scanner import scan_folder
+from src.shuffle import ShuffledOrder
 
 class ImageHandler:
-    def __init__(self):
-        self.images = []
+    def __init__(self, metadata_lookup=None):
+        self.images = ImageCatalog()
+        # paths -> {path: metadata} for sorting by mtime, size or dimensions
+        self.metadata_lookup = metadata_lookup
         self.current_image_index = 0
         self.display_method = "name"
+        self.shuffle = None  # ShuffledOrder used in "random" mode, built lazily
+        self.shuffle_seed = None  # Fixed seed for the shuffle, None for a fresh one per folder
+        self.quarantine = []  # (path, reason) for files that failed to decode
+        self.hidden = set()  # Catalog ids skipped when stepping (near-duplicates)
 
-    def load_images(self, folder_path):
-        self.images = []
-        for file_name in os.listdir(folder_path):
-            if file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                file_path = os.path.join(folder_path, file_name)
-                try:
-                    # Attempt to open the image to ensure it is valid
-                    Image.open(file_path).verify()
-                    self.images.append(file_path)
-                except Exception as e:
-                    print(f"Skipping file {file_path}: {e}")
+    def load_images(self, folder_path, recursive=False):
+        """Scan a whole folder synchronously (see FolderScanner for the streaming version)"""
+        self.clear_images()
+        with instrumentation.span("scan.load_images", folder=folder_path):
+            self.images = ImageCatalog(scan_folder(folder_path, recursive))
+        if self.display_method != "random":
+            self.images.sort(self.display_method, self.metadata_lookup)
+
+    def clear_images(self):
+        self.images = ImageCatalog()
         self.current_image_index = 0
-        if self.display_method == "name":
-            self.images.sort()
+        self.shuffle = None
+        self.quarantine = []
+        self.hidden = set()
+
+    def add_images(self, paths):
+        """Add newly found images while keeping the current image selected"""
+        if self.display_method == "random":
+            # Appending keeps indices stable, so the shuffled order just grows
+            self.images.extend(paths)
+            return
+        current = self.current_file_id()
+        self.images.add_sorted(paths, self.display_method, self.metadata_lookup)
+        self.select_file_id(current)
+
+    def select_image(self, path):
+        """Make path the current image, if it is listed"""
+        try:
+            self.current_image_index = self.images.index(path)
+        except ValueError:
+            pass
+
+    def current_file_id(self):
+        return self.images.order[self.current_image_index] if self.has_images() else None
+
+    def select_file_id(self, file_id):
+        """Point at a file again after the listing was reordered"""
+        if file_id is not None:
+            self.current_image_index = self.images.order.index(file_id)
+
+    def quarantine_image(self, path, reason):
+        """Drop an image that failed to decode; the next one takes its place"""
+        try:
+            index = self.images.index(path)
+        except ValueError:
+            return
+        del self.images[index]
+        self.quarantine.append((path, str(reason)))
+        print(f"Quarantined {path}: {reason}")
+        if index < self.current_image_index:
+            self.current_image_index -= 1
+        if self.current_image_index >= len(self.images):
+            self.current_image_index = 0
 
     def has_images(self):
         return len(self.images) > 0
@@ -31,21 +77,68 @@ class ImageHandler:
             return self.images[self.current_image_index]
         return None
 
+    def shuffled_order(self):
+        """The shuffle for "random" mode, kept in step with the image count"""
+        if self.shuffle is None:
+            self.shuffle = ShuffledOrder(len(self.images), self.shuffle_seed)
+        elif self.shuffle.count != len(self.images):
+            self.shuffle.resize(len(self.images))
+        return self.shuffle
+
+    def set_shuffle_seed(self, seed):
+        """Fix the random order so a session can be replayed"""
+        self.shuffle_seed = seed
+        self.shuffle = None
+
+    def hide_images(self, paths):
+        """Skip these images when stepping; the current one stays until it is left"""
+        paths = set(paths)
+        # One pass over the catalog; looking each path up would search the names every time
+        self.hidden = {file_id for file_id, path in zip(self.images.order, self.images) if path in paths}
+
+    def step_index(self, index, direction=1):
+        """Index of the image after (or before, direction=-1) the given one, skipping hidden ones"""
+        for _ in range(len(self.images)):
+            index = self._step(index, direction)
+            if self.images.order[index] not in self.hidden:
+                break
+        return index
+
+    def _step(self, index, direction):
+        if self.display_method == "random":
+            order = self.shuffled_order()
+            return order.index_at(order.step(order.position_of(index), direction))
+        return (index + direction) % len(self.images)
+
     def next_image(self):
         if self.has_images():
-            if self.display_method == "random":
-                self.current_image_index = random.randint(0, len(self.images) - 1)
-            else:
-                self.current_image_index = (self.current_image_index + 1) % len(self.images)
+            self.current_image_index = self.step_index(self.current_image_index, 1)
 
     def previous_image(self):
         if self.has_images():
-            if self.display_method == "random":
-                self.current_image_index = random.randint(0, len(self.images) - 1)
-            else:
-                self.current_image_index = (self.current_image_index - 1) % len(self.images)
+            self.current_image_index = self.step_index(self.current_image_index, -1)
+
+    def upcoming_images(self, ahead=2, behind=1):
+        """Paths likely to be shown soon, most likely first (current image included)"""
+        if not self.has_images():
+            return []
+        indices = [self.current_image_index]
+        forward = backward = self.current_image_index
+        for step in range(1, max(ahead, behind) + 1):
+            if step <= ahead:
+                forward = self.step_index(forward, 1)
+                indices.append(forward)
+            if step <= behind:
+                backward = self.step_index(backward, -1)
+                indices.append(backward)
+        return list(dict.fromkeys(self.images[i] for i in indices))
 
     def set_display_method(self, method):
+        """Sort by "name", "mtime", "size" or "dimensions", or shuffle ("random")"""
+        current = self.current_file_id()
         self.display_method = method
-        if method == "name":
-            self.images.sort()
\ No newline at end of file
+        self.shuffle = None
+        if method != "random":
+            self.images.sort(method, self.metadata_lookup)
+            # Stay on the same picture rather than the same index
+            self.select_file_id(current)
@@ -0,0 +1,160 @@
+from PIL import Image
+
+from src import instrumentation
+
+# Used when the screen size is not known
+DEFAULT_MAX_DIMENSION = 1920
+# Never prepare images smaller than this, so zooming still has some detail
+MIN_MAX_DIMENSION = 1024
+# Images only slightly larger than the target are kept as they are
+REDUCE_SLACK = 1.25
+# A JPEG scaled while decoding is kept if within this of the target: resampling
+# it (e.g. 3000 px to 1920) costs about as much as the decode saved, and the
+# render pyramid reduces it for display anyway. Draft scales halve, so at 2.0
+# only very large JPEGs still get resampled.
+DRAFT_SLACK = 2.0
+
+EXIF_ORIENTATION = 0x0112
+# EXIF orientation -> transpose that makes the image upright (as in ImageOps.exif_transpose)
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+
+def display_max_dimension(screen_width, screen_height):
+    """Longest side an image needs to have to fill the screen"""
+    return max(MIN_MAX_DIMENSION, screen_width, screen_height)
+
+
+def _fit_size(size, max_dimension):
+    width, height = size
+    scale_factor = max_dimension / max(width, height)
+    return max(1, round(width * scale_factor)), max(1, round(height * scale_factor))
+
+
+def oriented_size(width, height, orientation):
+    """Size of an image once its EXIF orientation has been applied"""
+    if orientation in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+
+def header_orientation(image):
+    """EXIF orientation of an opened image, parsed from the header already read by open()"""
+    if image.format not in ('JPEG', 'PNG', 'WEBP', 'TIFF'):
+        return 1
+    if image.format == 'PNG' and 'exif' not in image.info:
+        # getexif() would decode the whole PNG looking for an eXIf chunk after the pixels
+        return 1
+    try:
+        return image.getexif().get(EXIF_ORIENTATION, 1)
+    except Exception:
+        return 1
+
+
+def grey_to_8bit(image):
+    """L copy of a 16-bit, 32-bit or float greyscale image, scaled into 0-255 rather than clipped"""
+    if image.mode.startswith('I;16'):
+        image = image.convert('I')
+    low, high = image.getextrema()
+    if image.mode == 'F' and high <= 1.0:
+        scale = 255.0  # Floats normalised to 0-1
+    elif high > 255:
+        scale = 1 / 256  # 16-bit samples, however they are stored
+    else:
+        scale = 1
+    if scale != 1:
+        image = image.point(lambda value: value * scale)
+    return image.convert('L')
+
+
+def prepare_image(image_path, max_dimension=DEFAULT_MAX_DIMENSION):
+    """Decode an image at (roughly) display resolution, upright, flattened to RGB or L"""
+    with instrumentation.span("decode.open"):
+        original = Image.open(image_path)
+    orientation = header_orientation(original)
+    width, height = original.size
+    needs_reduce = max(width, height) > max_dimension * REDUCE_SLACK
+    target_size = _fit_size(original.size, max_dimension) if needs_reduce else original.size
+
+    if needs_reduce and original.format == 'JPEG':
+        # Let libjpeg scale while decoding (1/2, 1/4 or 1/8), never below the target
+        original.draft('L' if original.mode == 'L' else 'RGB', target_size)
+        # The scaled decode may already be close enough to skip resampling
+        needs_reduce = max(original.size) > max_dimension * DRAFT_SLACK
+
+    with instrumentation.span("decode.pixels", format=original.format):
+        original.load()
+
+    # Palette and bilevel images only resize with NEAREST, and palettes may carry
+    # transparency, so expand them before reducing
+    if original.mode == 'P':
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+    elif original.mode == 'LA':
+        original = original.convert('RGBA')
+    elif original.mode == '1':
+        original = original.convert('L')
+    elif original.mode in ('I', 'F') or original.mode.startswith('I;16'):
+        # Can't be reduced as they are, and convert('L') would clip rather than scale
+        original = grey_to_8bit(original)
+
+    if needs_reduce:
+        # Box-reduce by whole factors first, then one filtered pass to the exact size
+        with instrumentation.span("decode.reduce"):
+            original = original.resize(target_size, Image.HAMMING, reducing_gap=1.0)
+
+    if orientation in ORIENTATION_TRANSPOSE:
+        # Rotating the reduced image is far cheaper than rotating the full decode
+        with instrumentation.span("decode.orient"):
+            original = original.transpose(ORIENTATION_TRANSPOSE[orientation])
+
+    # Check for alpha channel (composited after reducing, so on far fewer pixels)
+    if original.mode == 'RGBA':
+        with instrumentation.span("decode.alpha_composite"):
+            # Create a white background
+            background = Image.new('RGB', original.size, (255, 255, 255))
+            # Composite the image onto the background
+            original = Image.alpha_composite(background.convert('RGBA'), original).convert('RGB')
+    elif original.mode not in ('RGB', 'L'):
+        # Normalise everything else (CMYK, LAB...) to plain RGB pixels
+        original = original.convert('RGB')
+
+    return original
+
+
+def load_display_image(image_path, max_dimension=DEFAULT_MAX_DIMENSION, disk_cache=None):
+    """prepare_image, served from the on-disk display cache when possible"""
+    if disk_cache is not None:
+        cached = disk_cache.get(image_path, max_dimension)
+        if cached is not None:
+            return cached
+
+    image = prepare_image(image_path, max_dimension)
+
+    if disk_cache is not None:
+        disk_cache.put(image_path, max_dimension, image)
+    return image
+
+
+def read_image_info(image_path):
+    """Format, size and EXIF orientation from the file header, without decoding pixels"""
+    with Image.open(image_path) as image:
+        orientation = header_orientation(image)
+        return {
+            'format': image.format,
+            'width': image.width,
+            'height': image.height,
+            'orientation': orientation,
+        }
+
+
+def image_size_bytes(image):
+    """Approximate memory used by the pixel data of a PIL image"""
+    width, height = image.size
+    return width * height * len(image.getbands())
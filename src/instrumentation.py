@@ -0,0 +1,163 @@
+"""Lightweight timing instrumentation for the hot paths.
+
+Everything here is off by default. While disabled, span() returns a
+shared no-op context manager, so instrumented code pays for a single
+flag check. Turn it on with the SKETCH_PROFILE=1 environment variable or
+from the Settings tab; SKETCH_TRACE=<file> also writes a Chrome trace on
+exit.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_TRACE_EVENTS = 100000
+MAX_SAMPLES = 2000
+
+enabled = os.environ.get("SKETCH_PROFILE", "") not in ("", "0") or bool(os.environ.get("SKETCH_TRACE"))
+
+_lock = threading.Lock()
+_histograms = {}  # name -> Histogram
+_events = deque(maxlen=MAX_TRACE_EVENTS)
+_stats_sources = {}  # name -> callable returning a dict
+_origin_ns = time.perf_counter_ns()
+
+
+class Histogram:
+    """Count and total of all samples plus a window of recent ones for percentiles"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def percentile(fraction):
+            return round(recent[min(len(recent) - 1, int(len(recent) * fraction))], 3) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start_ns")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end_ns = time.perf_counter_ns()
+        _record(self.name, self.start_ns, end_ns - self.start_ns, self.args)
+        return False
+
+
+def set_enabled(value):
+    global enabled
+    enabled = bool(value)
+
+
+def span(name, **args):
+    """Context manager timing a block as stage name (no-op while disabled)"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def record(name, duration_ms, **args):
+    """Add a duration measured elsewhere (e.g. timer jitter) to a stage"""
+    if not enabled:
+        return
+    duration_ns = int(duration_ms * 1e6)
+    _record(name, time.perf_counter_ns() - duration_ns, duration_ns, args)
+
+
+def _record(name, start_ns, duration_ns, args):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(duration_ns / 1e6)
+        _events.append((name, start_ns, duration_ns, threading.get_ident(), args))
+
+
+def register_stats(name, source):
+    """Include source() (a dict, e.g. cache counters) in summaries and traces"""
+    _stats_sources[name] = source
+
+
+def summary():
+    """Per-stage timing histograms plus registered stats"""
+    with _lock:
+        stages = {name: histogram.summary() for name, histogram in _histograms.items()}
+    stats = {}
+    for name, source in _stats_sources.items():
+        try:
+            stats[name] = source()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return {"enabled": enabled, "stages": stages, "stats": stats}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _events.clear()
+
+
+def export_chrome_trace(path):
+    """Write recorded spans in Chrome trace-event format (chrome://tracing, Perfetto)"""
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    trace = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "5 minute sketcher"}}]
+    for name, start_ns, duration_ns, thread_id, args in events:
+        trace.append({
+            "name": name,
+            "cat": name.split(".")[0],
+            "ph": "X",
+            "ts": (start_ns - _origin_ns) / 1000,
+            "dur": duration_ns / 1000,
+            "pid": pid,
+            "tid": thread_id,
+            "args": {key: str(value) for key, value in args.items()},
+        })
+    # Cache counters as one final counter sample each
+    now_us = (time.perf_counter_ns() - _origin_ns) / 1000
+    for name, values in summary()["stats"].items():
+        numbers = {key: value for key, value in values.items() if isinstance(value, (int, float))}
+        if numbers:
+            trace.append({"name": name, "ph": "C", "ts": now_us, "pid": pid, "args": numbers})
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+    return len(trace)
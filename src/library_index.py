@@ -0,0 +1,239 @@
+import os
+import sqlite3
+import threading
+
+from src.session import default_cache_dir
+from src.image_loader import read_image_info, oriented_size
+from src.scanner import IMAGE_EXTENSIONS, sniff_image_format
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS folders_parent ON folders (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    mtime_ns INTEGER,
+    size INTEGER,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    orientation INTEGER,
+    valid INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_folder ON files (folder);
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    size INTEGER,
+    dhash INTEGER
+);
+"""
+
+# SQLite integers are signed; hashes are stored shifted into that range
+HASH_OFFSET = 1 << 63
+
+FILE_COLUMNS = ("path", "folder", "mtime_ns", "size", "format", "width", "height", "orientation", "valid")
+
+
+class LibraryIndex:
+    """Persistent SQLite index of every image seen in the scanned folders.
+
+    A folder whose mtime hasn't changed since the last scan is served
+    straight from the index; otherwise only its new or modified files are
+    probed again.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_dir(), "library.sqlite3")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        # Shared between the scan thread and the Tk thread, guarded by the lock
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.lock:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            # A lost write only means a file gets probed again, so skip the fsyncs
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def scan(self, folder_path, recursive=False, stop_event=None):
+        """Yield valid image paths under folder_path, rescanning only what changed"""
+        pending = [os.path.abspath(folder_path)]
+        while pending:
+            if stop_event is not None and stop_event.is_set():
+                return
+            current = pending.pop()
+            try:
+                folder_mtime = os.stat(current).st_mtime_ns
+            except OSError as e:
+                print(f"Could not read folder {current}: {e}")
+                self._forget_folder(current)
+                continue
+
+            with self.lock:
+                row = self.connection.execute(
+                    "SELECT mtime_ns FROM folders WHERE path = ?", (current,)).fetchone()
+
+            if row is not None and row[0] == folder_mtime:
+                # Nothing was added or removed here since the last scan
+                with self.lock:
+                    paths = [r[0] for r in self.connection.execute(
+                        "SELECT path FROM files WHERE folder = ? AND valid = 1 ORDER BY path", (current,))]
+                    subfolders = [r[0] for r in self.connection.execute(
+                        "SELECT path FROM folders WHERE parent = ?", (current,))]
+                yield from paths
+            else:
+                subfolders = yield from self._rescan_folder(current, folder_mtime, stop_event)
+                if subfolders is None:
+                    return  # Stopped part way; the folder stays marked as changed
+
+            if recursive:
+                pending.extend(sorted(subfolders, reverse=True))
+
+    def _rescan_folder(self, folder, folder_mtime, stop_event):
+        """List one folder, probe new/changed files and store the result"""
+        with self.lock:
+            known = {r[0]: (r[1], r[2], r[3]) for r in self.connection.execute(
+                "SELECT path, mtime_ns, size, valid FROM files WHERE folder = ?", (folder,))}
+
+        seen = set()
+        subfolders = []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if stop_event is not None and stop_event.is_set():
+                        return None
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'):
+                                subfolders.append(entry.path)
+                            continue
+                        if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+
+                    seen.add(entry.path)
+                    previous = known.get(entry.path)
+                    if previous is not None and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                        valid = previous[2]
+                    else:
+                        valid = self._probe_and_store(entry.path, folder, stat)
+                    if valid:
+                        yield entry.path
+        except OSError as e:
+            print(f"Could not read folder {folder}: {e}")
+            return []
+
+        with self.lock, self.connection:
+            removed = [(path,) for path in known if path not in seen]
+            self.connection.executemany("DELETE FROM files WHERE path = ?", removed)
+            self.connection.executemany("DELETE FROM hashes WHERE path = ?", removed)
+            for (path,) in self.connection.execute(
+                    "SELECT path FROM folders WHERE parent = ?", (folder,)).fetchall():
+                if path not in subfolders:
+                    self._forget_folder_locked(path)
+            for path in subfolders:
+                # mtime 0 means "never scanned", so the first visit always lists it
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO folders (path, parent, mtime_ns) VALUES (?, ?, 0)", (path, folder))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO folders (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                (folder, os.path.dirname(folder), folder_mtime))
+        return subfolders
+
+    def _probe_and_store(self, path, folder, stat):
+        """Read header metadata for one file and record it; returns validity"""
+        info = None
+        if sniff_image_format(path):
+            try:
+                info = read_image_info(path)
+            except Exception as e:
+                print(f"Skipping file {path}: {e}")
+        else:
+            print(f"Skipping file {path}: not a recognised image")
+
+        info = info or {}
+        row = (path, folder, stat.st_mtime_ns, stat.st_size, info.get('format'), info.get('width'),
+               info.get('height'), info.get('orientation'), 1 if info else 0)
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(FILE_COLUMNS)}) VALUES ({', '.join('?' * len(FILE_COLUMNS))})",
+                row)
+        return bool(info)
+
+    def _forget_folder(self, folder):
+        with self.lock, self.connection:
+            self._forget_folder_locked(folder)
+
+    def _forget_folder_locked(self, folder):
+        """Remove a folder and everything below it (lock must be held)"""
+        prefix = folder.rstrip(os.sep) + os.sep
+        self.connection.execute(
+            "DELETE FROM files WHERE folder = ? OR substr(folder, 1, ?) = ?", (folder, len(prefix), prefix))
+        self.connection.execute(
+            "DELETE FROM folders WHERE path = ? OR substr(path, 1, ?) = ?", (folder, len(prefix), prefix))
+        self.connection.execute(
+            "DELETE FROM hashes WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+
+    def mark_invalid(self, path):
+        """Record that a file failed to decode, so later scans skip it"""
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE files SET valid = 0 WHERE path = ?", (path,))
+
+    def get_metadata(self, path):
+        """Stored metadata for one file as a dict, or None if it isn't indexed"""
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(FILE_COLUMNS)} FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(zip(FILE_COLUMNS, row)) if row else None
+
+    def get_display_size(self, path):
+        """Upright (width, height) of an indexed file, known before it is decoded"""
+        metadata = self.get_metadata(path)
+        if not metadata or not metadata['width'] or not metadata['height']:
+            return None
+        return oriented_size(metadata['width'], metadata['height'], metadata['orientation'])
+
+    def get_metadata_many(self, paths):
+        """Metadata for many files at once, keyed by path"""
+        result = {}
+        paths = list(paths)
+        with self.lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                for row in self.connection.execute(
+                        f"SELECT {', '.join(FILE_COLUMNS)} FROM files WHERE path IN ({', '.join('?' * len(chunk))})",
+                        chunk):
+                    result[row[0]] = dict(zip(FILE_COLUMNS, row))
+        return result
+
+    def get_hashes(self, paths):
+        """Stored perceptual hashes by path, for files unchanged since they were hashed"""
+        result = {}
+        paths = list(paths)
+        with self.lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                for path, dhash in self.connection.execute(
+                        "SELECT h.path, h.dhash FROM hashes h JOIN files f ON f.path = h.path "
+                        "AND f.mtime_ns = h.mtime_ns AND f.size = h.size "
+                        f"WHERE h.path IN ({', '.join('?' * len(chunk))})", chunk):
+                    result[path] = dhash + HASH_OFFSET
+        return result
+
+    def set_hashes(self, hashes):
+        """Store perceptual hashes ({path: hash}) against the files' current mtime and size"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO hashes (path, mtime_ns, size, dhash) "
+                "SELECT path, mtime_ns, size, ? FROM files WHERE path = ?",
+                [(value - HASH_OFFSET, path) for path, value in hashes.items()])
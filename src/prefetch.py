@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.image_loader import prepare_image, image_size_bytes
+
+# How many measured decode times to remember
+MAX_DECODE_COSTS = 1024
+
+
+class Prefetcher:
+    """Decodes and prepares images ahead of time on a small worker pool.
+
+    Prepared images are kept in memory keyed by path, so switching to an
+    image that was prefetched is just a dictionary lookup.
+    """
+
+    def __init__(self, loader=prepare_image, workers=2, budget_bytes=256 * 1024 * 1024):
+        self.loader = loader
+        self.budget_bytes = budget_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.lock = threading.RLock()
+        self.futures = {}  # path -> Future resolving to a prepared PIL image
+        self.wanted = []   # paths in priority order, most important first
+        self.hits = 0      # requests that found the image already decoded
+        self.misses = 0
+        self.decode_costs = {}  # path -> seconds its last decode took
+        self.new_costs = []     # (path, seconds) not yet collected by take_decode_costs
+
+    def _load(self, image_path):
+        start = time.perf_counter()
+        image = self.loader(image_path)
+        seconds = time.perf_counter() - start
+        with self.lock:
+            self.decode_costs.pop(image_path, None)
+            self.decode_costs[image_path] = seconds
+            if len(self.decode_costs) > MAX_DECODE_COSTS:
+                del self.decode_costs[next(iter(self.decode_costs))]
+            self.new_costs.append((image_path, seconds))
+        return image
+
+    def _start(self, image_path):
+        """Future for image_path, submitting a decode if there isn't one (lock held)"""
+        future = self.futures.get(image_path)
+        if future is None or future.cancelled():
+            future = self.executor.submit(self._load, image_path)
+            self.futures[image_path] = future
+            future.add_done_callback(lambda f: self._enforce_budget())
+        return future
+
+    def request(self, image_path):
+        """Return a future for the prepared image, starting a decode if needed"""
+        with self.lock:
+            future = self.futures.get(image_path)
+            if future is not None and future.done() and not future.cancelled():
+                self.hits += 1
+            else:
+                self.misses += 1
+            return self._start(image_path)
+
+    def future(self, image_path):
+        """Like request(), but not counted: for polling a path that was already requested"""
+        with self.lock:
+            return self._start(image_path)
+
+    def get(self, image_path):
+        """Return the prepared image, blocking until it has been decoded"""
+        return self.request(image_path).result()
+
+    def prefetch(self, image_paths):
+        """Keep only the given paths (in priority order) and decode the missing ones"""
+        image_paths = list(dict.fromkeys(image_paths))
+        with self.lock:
+            self.retain(image_paths)
+            for path in image_paths:
+                self._start(path)
+        self._enforce_budget()
+
+    def warm(self, image_path):
+        """Start decoding one image in the background (not counted as a request)"""
+        with self.lock:
+            self._start(image_path)
+
+    def retain(self, image_paths):
+        """Set the priority order and drop everything else, without starting decodes"""
+        image_paths = list(dict.fromkeys(image_paths))
+        with self.lock:
+            self.wanted = image_paths
+            for path in list(self.futures):
+                if path not in image_paths:
+                    self.futures.pop(path).cancel()
+
+    def is_started(self, image_path):
+        with self.lock:
+            future = self.futures.get(image_path)
+            return future is not None and not future.cancelled()
+
+    def is_ready(self, image_path):
+        with self.lock:
+            future = self.futures.get(image_path)
+            return future is not None and future.done() and not future.cancelled()
+
+    def decode_cost(self, image_path):
+        """Seconds the last decode of image_path took, None if never measured"""
+        with self.lock:
+            return self.decode_costs.get(image_path)
+
+    def take_decode_costs(self):
+        """(path, seconds) of the decodes finished since the last call"""
+        with self.lock:
+            costs, self.new_costs = self.new_costs, []
+        return costs
+
+    def _enforce_budget(self):
+        """Drop the lowest priority prepared images until we fit in the byte budget"""
+        with self.lock:
+            order = {path: i for i, path in enumerate(self.wanted)}
+            done = [(path, f) for path, f in self.futures.items()
+                    if f.done() and not f.cancelled() and f.exception() is None]
+            total = sum(image_size_bytes(f.result()) for _, f in done)
+            if total <= self.budget_bytes:
+                return
+            # Never drop the most important entry, even if it alone is over budget
+            done.sort(key=lambda item: order.get(item[0], len(order)), reverse=True)
+            for path, future in done[:-1]:
+                if total <= self.budget_bytes:
+                    break
+                total -= image_size_bytes(future.result())
+                del self.futures[path]
+
+    def discard(self, image_path):
+        """Forget a path, e.g. after the file failed to decode"""
+        with self.lock:
+            future = self.futures.pop(image_path, None)
+            if future:
+                future.cancel()
+
+    def clear(self):
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+            self.futures.clear()
+            self.wanted = []
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self.lock:
+            ready = sum(1 for f in self.futures.values() if f.done() and not f.cancelled())
+        return {"hits": self.hits, "misses": self.misses, "ready": ready,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,161 @@
+# Added to every lead time, covering handing the image to the UI
+MIN_LEAD_SECONDS = 0.5
+# Multiplier on the expected decode time; grows after a late image, shrinks while on time
+INITIAL_SAFETY = 2.0
+MIN_SAFETY = 1.5
+MAX_SAFETY = 8.0
+LATE_GROWTH = 1.5
+ON_TIME_DECAY = 0.95
+# Used until the first decode has been measured
+DEFAULT_DECODE_SECONDS = 0.25
+# Weight of the newest measurement in the running averages
+AVERAGE_WEIGHT = 0.2
+# Longest sleep between checks, so pauses and timer restarts are noticed
+MAX_WAIT_SECONDS = 1.0
+# Delay before trying again while the user is zooming or panning
+BACKOFF_SECONDS = 0.1
+
+
+class PrefetchScheduler:
+    """Decides when upcoming images get decoded.
+
+    With the session timer running, only the next image is decoded, and
+    only once the switch is its expected decode time (times a safety
+    factor that adapts to late images) away. Without the timer the
+    neighbours are decoded straight away for arrow-key browsing. Either
+    way, work waits while the user is zooming or panning unless waiting
+    would make the next image late.
+    """
+
+    def __init__(self, root, prefetcher, timer, image_handler, is_interacting=None, library_index=None,
+                 ahead=2, behind=1):
+        self.root = root
+        self.prefetcher = prefetcher
+        self.timer = timer
+        self.image_handler = image_handler
+        self.is_interacting = is_interacting
+        self.library_index = library_index
+        self.ahead = ahead
+        self.behind = behind
+        self.safety = INITIAL_SAFETY
+        self.seconds_per_image = None  # Running average decode time
+        self.seconds_per_megapixel = None  # Same, per megapixel of the source file
+        self.pending = []  # Paths still to be started, most important first
+        self.target = None  # The image the next timer switch will show
+        self.after_id = None
+        self.on_time = 0
+        self.late = 0
+
+    def image_changed(self):
+        """Replan after the current image has changed"""
+        self._cancel()
+        paths = self.image_handler.upcoming_images(self.ahead, self.behind)
+        # Keep what is already decoded for the neighbours, drop the rest
+        self.prefetcher.retain(paths)
+        self.target = self._next_path()
+        self.pending = [path for path in paths[1:] if not self.prefetcher.is_started(path)]
+        self._check()
+
+    def _next_path(self):
+        if not self.image_handler.has_images():
+            return None
+        return self.image_handler.images[
+            self.image_handler.step_index(self.image_handler.current_image_index, 1)]
+
+    def note_switch(self):
+        """Call when the timer switches images, before moving on; adapts the safety factor"""
+        if self.target is None:
+            return
+        if self.prefetcher.is_ready(self.target):
+            self.on_time += 1
+            self.safety = max(MIN_SAFETY, self.safety * ON_TIME_DECAY)
+        else:
+            self.late += 1
+            self.safety = min(MAX_SAFETY, self.safety * LATE_GROWTH)
+
+    def _check(self):
+        self.after_id = None
+        self._learn()
+        self.pending = [path for path in self.pending if not self.prefetcher.is_started(path)]
+        if not self.pending:
+            return
+
+        remaining = self.timer.time_until_switch()
+        if remaining is None:
+            # No timer: get the neighbours ready now, unless the user is busy with the view
+            if self._interacting():
+                self._wait(BACKOFF_SECONDS)
+                return
+            for path in self.pending:
+                self.prefetcher.warm(path)
+            self.pending = []
+            return
+
+        # Timed session: only the next image matters, and only just in time
+        if self.target not in self.pending:
+            self.pending = []
+            return
+        expected = self.expected_decode_seconds(self.target)
+        lead = min(self.timer.interval, expected * self.safety + MIN_LEAD_SECONDS)
+        if remaining > lead:
+            self._wait(remaining - lead)
+            return
+        if self._interacting() and remaining - BACKOFF_SECONDS > expected * MIN_SAFETY + MIN_LEAD_SECONDS:
+            self._wait(BACKOFF_SECONDS)
+            return
+        self.prefetcher.warm(self.target)
+        self.pending = []
+
+    def _wait(self, seconds):
+        seconds = max(0.01, min(seconds, MAX_WAIT_SECONDS))
+        self.after_id = self.root.after(round(seconds * 1000), self._check)
+
+    def _interacting(self):
+        return self.is_interacting is not None and self.is_interacting()
+
+    def _megapixels(self, path):
+        if self.library_index is None:
+            return None
+        metadata = self.library_index.get_metadata(path)
+        if not metadata or not metadata['width'] or not metadata['height']:
+            return None
+        return metadata['width'] * metadata['height'] / 1e6
+
+    def _learn(self):
+        """Fold the decode times measured since the last check into the averages"""
+        for path, seconds in self.prefetcher.take_decode_costs():
+            self.seconds_per_image = _average(self.seconds_per_image, seconds)
+            megapixels = self._megapixels(path)
+            if megapixels:
+                self.seconds_per_megapixel = _average(self.seconds_per_megapixel, seconds / megapixels)
+
+    def expected_decode_seconds(self, path):
+        """Measured decode time of path, else an estimate from its size, else the average"""
+        known = self.prefetcher.decode_cost(path)
+        if known is not None:
+            return known
+        if self.seconds_per_megapixel is not None:
+            megapixels = self._megapixels(path)
+            if megapixels:
+                return self.seconds_per_megapixel * megapixels
+        return self.seconds_per_image if self.seconds_per_image is not None else DEFAULT_DECODE_SECONDS
+
+    def stats(self):
+        switches = self.on_time + self.late
+        return {"on_time": self.on_time, "late": self.late, "safety": round(self.safety, 2),
+                "hit_rate": self.on_time / switches if switches else 0.0}
+
+    def _cancel(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def stop(self):
+        self._cancel()
+        self.pending = []
+
+
+def _average(previous, value):
+    if previous is None:
+        return value
+    return previous + AVERAGE_WEIGHT * (value - previous)
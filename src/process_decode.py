@@ -0,0 +1,199 @@
+"""Optional decoding of huge images in worker processes.
+
+Threads overlap file I/O, but a 100 MP PNG or TIFF spends most of its
+time in decode, reduce and convert steps that don't release the GIL for
+long. Workers decode in their own process and write the display sized
+pixels into a shared memory block; the main process wraps that block as
+a PIL image without copying. Blocks come from a pool and go back to it
+when the image is garbage collected, so a steady stream of decodes does
+no large allocations. Turn it on with SKETCH_DECODE=process.
+"""
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from PIL import Image
+
+from src import instrumentation
+from src.disk_cache import STORED_MODES
+from src.image_loader import DRAFT_SLACK, REDUCE_SLACK, load_display_image, prepare_image, read_image_info
+
+# Smaller images decode faster in a thread than the round trip to a process costs
+PROCESS_MIN_PIXELS = 24 * 1000 * 1000
+MAX_BLOCKS = 8
+WRITE_CHUNK_BYTES = 1024 * 1024
+
+# Blocks a worker process has attached to, by name (worker side only)
+_attached_blocks = {}
+
+
+def _write_pixels(image, buffer):
+    """Copy an image's raw pixels into buffer a strip of rows at a time, never all at once"""
+    width, height = image.size
+    row_bytes = width * len(image.getbands())
+    rows = max(1, WRITE_CHUNK_BYTES // row_bytes)
+    for top in range(0, height, rows):
+        strip = image.crop((0, top, width, min(height, top + rows))).tobytes()
+        buffer[top * row_bytes:top * row_bytes + len(strip)] = strip
+
+
+def _decode_into(image_path, max_dimension, block_name, block_bytes):
+    """Worker: prepare an image and write it to the named block.
+
+    Returns (mode, size, pixels); pixels is None when they went into the
+    block, or a bytes copy when there was no block or it was too small.
+    """
+    image = prepare_image(image_path, max_dimension)
+    mode = STORED_MODES[image.mode]
+    if image.mode != mode:
+        image = image.convert(mode)
+    nbytes = image.width * image.height * len(mode)
+    if block_name is None or nbytes > block_bytes:
+        return mode, image.size, image.tobytes()
+    block = _attached_blocks.get(block_name)
+    if block is None:
+        block = _attached_blocks[block_name] = shared_memory.SharedMemory(name=block_name)
+    _write_pixels(image, block.buf)
+    return mode, image.size, None
+
+
+class SharedBlock(shared_memory.SharedMemory):
+    """Shared memory that may outlive close() while an image still points into it"""
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass  # The mapping goes away with the last image using it
+
+
+class SharedBlockPool:
+    """Equal sized shared memory blocks, reused rather than allocated per image"""
+
+    def __init__(self, block_bytes, max_blocks=MAX_BLOCKS):
+        self.block_bytes = block_bytes
+        self.max_blocks = max_blocks
+        self.lock = threading.Lock()
+        self.blocks = []
+        self.free = []
+
+    def acquire(self):
+        """A free block, or None if all are in use (or shared memory is unavailable)"""
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            if len(self.blocks) >= self.max_blocks:
+                return None
+            try:
+                block = SharedBlock(create=True, size=self.block_bytes)
+            except OSError as e:
+                print(f"Could not allocate shared memory, copying decoded pixels instead: {e}")
+                self.max_blocks = len(self.blocks)
+                return None
+            self.blocks.append(block)
+            return block
+
+    def release(self, block):
+        with self.lock:
+            if block in self.blocks:
+                self.free.append(block)
+
+    def in_use(self):
+        with self.lock:
+            return len(self.blocks) - len(self.free)
+
+    def close(self):
+        with self.lock:
+            blocks, self.blocks, self.free = self.blocks, [], []
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # An image still points into it; unlinking is enough
+            try:
+                block.unlink()
+            except OSError:
+                pass
+
+
+class ProcessDecoder:
+    """Prefetcher loader that sends huge images to a process pool.
+
+    load() has the same result as load_display_image: images under
+    min_pixels, and display cache hits, never leave the calling thread.
+    """
+
+    def __init__(self, max_dimension, disk_cache=None, workers=2, max_blocks=MAX_BLOCKS,
+                 min_pixels=PROCESS_MIN_PIXELS):
+        self.max_dimension = max_dimension
+        self.disk_cache = disk_cache
+        self.workers = workers
+        self.min_pixels = min_pixels
+        # Room for the largest image prepare_image returns, stored as RGBX
+        side = int(max_dimension * max(REDUCE_SLACK, DRAFT_SLACK)) + 1
+        self.pool = SharedBlockPool(side * side * 4, max_blocks)
+        self.lock = threading.Lock()
+        self.executor = None  # Started with the first huge image
+        self.process_decodes = 0
+        self.copied = 0  # Decodes that had to send their pixels back as a copy
+
+    def load(self, image_path):
+        if not self._is_huge(image_path):
+            return load_display_image(image_path, self.max_dimension, self.disk_cache)
+        if self.disk_cache is not None:
+            cached = self.disk_cache.get(image_path, self.max_dimension)
+            if cached is not None:
+                return cached
+        image = self._decode_in_process(image_path)
+        if self.disk_cache is not None:
+            self.disk_cache.put(image_path, self.max_dimension, image)
+        return image
+
+    def _is_huge(self, image_path):
+        try:
+            info = read_image_info(image_path)
+        except Exception:
+            return False  # Let the normal path report the error
+        return info['width'] * info['height'] >= self.min_pixels
+
+    def _decode_in_process(self, image_path):
+        with self.lock:
+            if self.executor is None:
+                # spawn: forking a process that runs Tk and worker threads isn't safe
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            executor = self.executor
+        block = self.pool.acquire()
+        try:
+            with instrumentation.span("decode.process"):
+                mode, size, pixels = executor.submit(_decode_into, image_path, self.max_dimension,
+                                                     block.name if block else None,
+                                                     self.pool.block_bytes).result()
+        except Exception:
+            if block:
+                self.pool.release(block)
+            raise
+        self.process_decodes += 1
+
+        if pixels is not None:
+            if block:
+                self.pool.release(block)
+            self.copied += 1
+            return Image.frombytes(mode, size, pixels)
+        # The image reads straight from the block, which is reused once the image is gone
+        image = Image.frombuffer(mode, size, block.buf, "raw", mode, 0, 1)
+        weakref.finalize(image, self.pool.release, block)
+        return image
+
+    def stats(self):
+        return {"process_decodes": self.process_decodes, "copied": self.copied,
+                "blocks": len(self.pool.blocks), "blocks_in_use": self.pool.in_use()}
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
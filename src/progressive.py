@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# Preview renders happen on the Tk thread; the high quality pass runs in the
+# background once the view has been left alone for a moment. Shared by the
+# single view and the board so both look and behave the same.
+PREVIEW_RESAMPLE = Image.NEAREST
+HIGH_QUALITY_RESAMPLE = Image.LANCZOS
+UPGRADE_DELAY_MS = 150
+
+
+class BackgroundRenderer:
+    """Runs render jobs on a worker thread and hands results back to Tk.
+
+    Only the latest job matters: submitting a new one (or calling
+    cancel) makes any earlier job stale, and stale results are dropped
+    instead of being delivered.
+    """
+
+    def __init__(self, root, poll_ms=15, name="render"):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.generation = 0
+        self.future = None
+        self.poll_id = None
+
+    def submit(self, job, on_done):
+        """Run job() off the Tk thread, then call on_done(result) on the Tk thread"""
+        self.cancel()
+        generation = self.generation
+        self.future = self.executor.submit(job)
+        self._poll(generation, self.future, on_done)
+
+    def _poll(self, generation, future, on_done):
+        self.poll_id = None
+        if generation != self.generation:
+            return
+        if not future.done():
+            self.poll_id = self.root.after(self.poll_ms, lambda: self._poll(generation, future, on_done))
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Background render failed: {e}")
+            return
+        on_done(result)
+
+    def cancel(self):
+        """Drop the current job; it won't be delivered even if it finishes"""
+        self.generation += 1
+        if self.future:
+            self.future.cancel()
+            self.future = None
+        if self.poll_id:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,52 @@
+import threading
+
+
+class ImagePyramid:
+    """Lazily built power-of-two mip-map chain for one image.
+
+    Level n is the source box-reduced by 2**n. resize() has the same
+    signature as PIL's Image.resize, but starts from the smallest level
+    that is still at least as large as the requested output. That keeps
+    filtered resizes cheap and free of aliasing at any zoom level.
+    """
+
+    def __init__(self, image, min_dimension=64):
+        self.levels = [image]
+        self.min_dimension = min_dimension
+        self.lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self.levels[0].size
+
+    @property
+    def mode(self):
+        return self.levels[0].mode
+
+    def level(self, index):
+        """Return level index, building any missing levels on the way"""
+        with self.lock:
+            while len(self.levels) <= index:
+                previous = self.levels[-1]
+                if min(previous.size) // 2 < self.min_dimension:
+                    break
+                self.levels.append(previous.reduce(2))
+            index = min(index, len(self.levels) - 1)
+            return index, self.levels[index]
+
+    def resize(self, size, resample=None, box=None):
+        """Image.resize, served from the best pyramid level"""
+        base = self.levels[0]
+        if box is None:
+            box = (0, 0, base.width, base.height)
+        # Ratio of source pixels to output pixels along the tighter axis
+        reduction = min((box[2] - box[0]) / max(1, size[0]), (box[3] - box[1]) / max(1, size[1]))
+        index = 0
+        while 2 ** (index + 1) <= reduction:
+            index += 1
+        index, image = self.level(index) if index else (0, base)
+
+        factor = 2 ** index
+        level_box = tuple(min(edge / factor, limit) for edge, limit in
+                          zip(box, (image.width, image.height, image.width, image.height)))
+        return image.resize(size, resample, box=level_box)
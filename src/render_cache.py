@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+from src.image_loader import image_size_bytes
+
+# Tk keeps its own 32-bit copy of every PhotoImage
+PHOTO_BYTES_PER_PIXEL = 4
+
+
+class RenderCache:
+    """Least recently used cache of finished renders, bounded in bytes.
+
+    Keys describe everything that affects a render (image identity, canvas
+    size, zoom, pan, resampling and filters), so an entry can be reused
+    across image switches and never shows a stale result. Values hold the
+    rendered PIL image, its canvas position and, once created on the Tk
+    thread, the matching PhotoImage.
+    """
+
+    def __init__(self, budget_bytes=128 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()  # key -> [image, position, photo, size_bytes]
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (image, position, photo) or None; photo may be None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1], entry[2]
+
+    def put(self, key, image, position, photo=None):
+        self.discard(key)
+        size_bytes = image_size_bytes(image)
+        if photo is not None:
+            size_bytes += image.width * image.height * PHOTO_BYTES_PER_PIXEL
+        if size_bytes > self.budget_bytes:
+            return
+        self.entries[key] = [image, position, photo, size_bytes]
+        self.total_bytes += size_bytes
+        self._evict()
+
+    def set_photo(self, key, photo):
+        """Attach a PhotoImage to an existing entry"""
+        entry = self.entries.get(key)
+        if entry is None or entry[2] is not None:
+            return
+        entry[2] = photo
+        extra = entry[0].width * entry[0].height * PHOTO_BYTES_PER_PIXEL
+        entry[3] += extra
+        self.total_bytes += extra
+        self._evict(keep=key)
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[3]
+
+    def _evict(self, keep=None):
+        while self.total_bytes > self.budget_bytes and self.entries:
+            key = next(iter(self.entries))
+            if key == keep:
+                if len(self.entries) == 1:
+                    break
+                self.entries.move_to_end(key)
+                continue
+            self.discard(key)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
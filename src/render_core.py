@@ -0,0 +1,50 @@
+from PIL import Image
+
+from src import instrumentation
+from src.filters import apply_chain
+from src.pyramid import ImagePyramid
+from src.viewport import render_viewport
+
+
+def filtered_source(source, filter_chain, filter_cache=None, cache_key=None):
+    """source (a prepared image or an ImagePyramid) with the filter chain applied, as a pyramid.
+
+    Filters such as notan and edges take their thresholds from the pixels
+    they see, so they run over the whole image rather than the rendered
+    crop, and the result doesn't change with zoom and pan. Given a
+    filter_cache and a cache_key identifying source, each image and chain
+    is filtered once.
+    """
+    if not filter_chain:
+        return source
+    filter_chain = tuple(filter_chain)
+    key = (cache_key, filter_chain)
+    if filter_cache is not None and cache_key is not None:
+        pyramid = filter_cache.get(key)
+        if pyramid is not None:
+            return pyramid
+    image = source.levels[0] if isinstance(source, ImagePyramid) else source
+    with instrumentation.span("filters.apply", chain=",".join(filter_chain)):
+        filtered = apply_chain(image, filter_chain)
+    pyramid = ImagePyramid(filtered)
+    if filter_cache is not None and cache_key is not None:
+        filter_cache.put(key, pyramid, filtered)
+    return pyramid
+
+
+def render_view(source, viewport_size, zoom_factor=1.0, pan=(0, 0), filter_chain=(),
+                resample=Image.LANCZOS, margin=0, filter_cache=None, cache_key=None):
+    """Render one view of an image without any UI.
+
+    source is a prepared PIL image or an ImagePyramid, viewport_size the
+    (width, height) of the canvas. Filters are applied to the whole image
+    first (see filtered_source). Returns (image, (x, y)) with the top-left
+    canvas position, or (None, None) if nothing is visible.
+    """
+    source = filtered_source(source, filter_chain, filter_cache, cache_key)
+    with instrumentation.span("render.resize", zoom=zoom_factor, resample=resample):
+        rendered, position = render_viewport(source, viewport_size, zoom_factor, pan[0], pan[1],
+                                             resample, margin=margin)
+    if rendered is None:
+        return None, None
+    return rendered, position
@@ -0,0 +1,114 @@
+import os
+import queue
+import threading
+
+from src import instrumentation
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+# Leading bytes of each supported format, checked instead of a full verify()
+FILE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+SNIFF_BYTES = 16
+
+
+def sniff_image_format(file_path):
+    """Cheaply identify an image by its header bytes, None if it isn't one"""
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+    for signature, image_format in FILE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    # RIFF container: b'RIFF', 4 size bytes, then the form type
+    if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def scan_folder(folder_path, recursive=False, stop_event=None):
+    """Yield image paths as they are found, optionally descending into subfolders"""
+    pending = [folder_path]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                subfolders = []
+                for entry in entries:
+                    if stop_event is not None and stop_event.is_set():
+                        return
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and not entry.name.startswith('.'):
+                                subfolders.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if sniff_image_format(entry.path):
+                        yield entry.path
+                    else:
+                        print(f"Skipping file {entry.path}: not a recognised image")
+                # Visit subfolders in name order
+                pending.extend(sorted(subfolders, reverse=True))
+        except OSError as e:
+            print(f"Could not read folder {current}: {e}")
+
+
+class FolderScanner:
+    """Runs scan_folder (or an incremental LibraryIndex scan) on a background
+    thread, handing out results in batches"""
+
+    def __init__(self, folder_path, recursive=False, library_index=None):
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.library_index = library_index
+        self.results = queue.Queue()
+        self.stop_event = threading.Event()
+        self.done = False
+        self.found = 0
+        self.thread = threading.Thread(target=self._run, name="folder-scan", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        if self.library_index is not None:
+            paths = self.library_index.scan(self.folder_path, self.recursive, self.stop_event)
+        else:
+            paths = scan_folder(self.folder_path, self.recursive, self.stop_event)
+        try:
+            with instrumentation.span("scan.folder", folder=self.folder_path):
+                for path in paths:
+                    self.results.put(path)
+        except Exception as e:
+            print(f"Folder scan of {self.folder_path} failed: {e}")
+        finally:
+            self.done = True
+
+    def drain(self, limit=5000):
+        """Return the paths found since the last call (without blocking)"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        self.found += len(batch)
+        return batch
+
+    def finished(self):
+        """True once the scan is over and every result has been drained"""
+        return self.done and self.results.empty()
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,51 @@
+"""Where the app keeps its files, and the session restored at start-up.
+
+Imported before the window exists, so this must stay free of PIL and
+the rest of the imaging stack.
+"""
+import json
+import os
+
+APP_NAME = "5minSketch"
+SESSION_FILE = "session.json"
+# The last view, as a PNG Tk can load by itself before PIL is imported
+PREVIEW_FILE = "session_preview.png"
+
+
+def default_cache_dir():
+    """Per-user cache directory for this app"""
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_NAME)
+
+
+def session_path():
+    return os.path.join(default_cache_dir(), SESSION_FILE)
+
+
+def preview_path():
+    return os.path.join(default_cache_dir(), PREVIEW_FILE)
+
+
+def load_session(path=None):
+    """The saved session as a dict, empty if there is none or it can't be read"""
+    try:
+        with open(path or session_path(), "r", encoding="utf-8") as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return session if isinstance(session, dict) else {}
+
+
+def save_session(session, path=None):
+    """Write the session atomically, so a crash never leaves half a file"""
+    path = path or session_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(session, f, indent=1)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not save session: {e}")
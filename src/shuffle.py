@@ -0,0 +1,77 @@
+import random
+
+FEISTEL_ROUNDS = 4
+MASK64 = (1 << 64) - 1
+
+
+def _mix(value):
+    """splitmix64 finaliser, a cheap well-distributed integer hash"""
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+class ShuffledOrder:
+    """Seeded no-repeat ordering of count items in O(1) memory.
+
+    A Feistel network permutes positions in a power-of-two domain a little
+    larger than count; positions that map past the end are skipped. The
+    walk is a fixed permutation, so stepping back retraces exactly what
+    was shown, and appending items only slots the new ones into the
+    existing order (until the domain has to grow).
+    """
+
+    def __init__(self, count, seed=None):
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.count = 0
+        self.half_bits = 0
+        self.resize(count)
+
+    @property
+    def domain(self):
+        return 1 << (2 * self.half_bits)
+
+    def resize(self, count):
+        """Follow the item count; the order only reshuffles if the domain must grow"""
+        self.count = count
+        # One spare bit of headroom so a few appends don't change the domain
+        bits = max(4, max(0, count - 1).bit_length() + 1)
+        half_bits = (bits + 1) // 2
+        if half_bits > self.half_bits:
+            self.half_bits = half_bits
+            self.mask = (1 << half_bits) - 1
+            self.round_keys = [_mix(self.seed * FEISTEL_ROUNDS + r) for r in range(FEISTEL_ROUNDS)]
+
+    def _round(self, r, value):
+        return _mix(self.round_keys[r] ^ value) & self.mask
+
+    def _permute(self, position):
+        left, right = position >> self.half_bits, position & self.mask
+        for r in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(r, right)
+        return (left << self.half_bits) | right
+
+    def _unpermute(self, value):
+        left, right = value >> self.half_bits, value & self.mask
+        for r in reversed(range(FEISTEL_ROUNDS)):
+            left, right = right ^ self._round(r, left), left
+        return (left << self.half_bits) | right
+
+    def index_at(self, position):
+        """Item shown at a position, or None if that position is skipped"""
+        index = self._permute(position % self.domain)
+        return index if index < self.count else None
+
+    def position_of(self, index):
+        """Position of an item in the order (inverse of index_at)"""
+        return self._unpermute(index)
+
+    def step(self, position, direction=1):
+        """Next (direction=1) or previous (direction=-1) position that maps to an item"""
+        if self.count == 0:
+            return position
+        while True:
+            position = (position + direction) % self.domain
+            if self._permute(position) < self.count:
+                return position
@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from src.disk_cache import DiskCache
+from src.image_loader import grey_to_8bit, header_orientation, ORIENTATION_TRANSPOSE
+from src.session import default_cache_dir
+
+THUMBNAIL_SIZE = 128
+# About 64 KB each as stored (RGBX), so this bounds memory at ~64 MB
+MEMORY_THUMBNAILS = 1024
+DISK_CACHE_MB = 512
+
+
+def make_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """Small upright copy of an image (RGB or L), decoded as cheaply as the format allows"""
+    with Image.open(image_path) as image:
+        orientation = header_orientation(image)
+        if image.format == 'JPEG':
+            # libjpeg scales by up to 1/8 while decoding
+            image.draft('L' if image.mode == 'L' else 'RGB', (size, size))
+        if image.mode in ('I', 'F') or image.mode.startswith('I;16'):
+            image = grey_to_8bit(image)
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGBA')
+        image.thumbnail((size, size), Image.HAMMING)
+
+    if image.mode == 'RGBA':
+        # Transparent areas show as white, like the display images
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    return image
+
+
+class ThumbnailCache:
+    """Thumbnails by path: kept in memory, then on disk, then made on a worker pool.
+
+    request() replaces the previous request, cancelling anything no longer
+    wanted, and the pool works through it in order, so whatever the
+    caller lists first (the thumbnails in view) is made first.
+    """
+
+    def __init__(self, disk_cache=None, workers=2, size=THUMBNAIL_SIZE, max_items=MEMORY_THUMBNAILS):
+        self.size = size
+        self.max_items = max_items
+        self.disk_cache = disk_cache or DiskCache(cache_dir=os.path.join(default_cache_dir(), "thumbnails"),
+                                                  max_bytes=DISK_CACHE_MB * 1024 * 1024)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # path -> thumbnail, least recently used first
+        self.futures = {}  # path -> Future of a thumbnail being made
+        self.finished = []  # paths made since the last take_finished()
+        self.failed = set()  # paths that could not be read, not retried
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_path):
+        """The thumbnail if it is in memory, else None (see request)"""
+        with self.lock:
+            thumbnail = self.memory.get(image_path)
+            if thumbnail is None:
+                self.misses += 1
+                return None
+            self.memory.move_to_end(image_path)
+            self.hits += 1
+            return thumbnail
+
+    def request(self, image_paths):
+        """Make thumbnails for image_paths, most important first, dropping older requests"""
+        wanted = set(image_paths)
+        with self.lock:
+            for path in list(self.futures):
+                if path not in wanted and self.futures[path].cancel():
+                    del self.futures[path]
+            for path in image_paths:
+                if path not in self.memory and path not in self.futures and path not in self.failed:
+                    self.futures[path] = self.executor.submit(self._make, path)
+
+    def pending(self):
+        with self.lock:
+            return len(self.futures)
+
+    def take_finished(self):
+        """Paths whose thumbnails were made since the last call"""
+        with self.lock:
+            finished, self.finished = self.finished, []
+        return finished
+
+    def _make(self, image_path):
+        try:
+            thumbnail = self.disk_cache.get(image_path, self.size)
+            if thumbnail is None:
+                thumbnail = make_thumbnail(image_path, self.size)
+                self.disk_cache.put(image_path, self.size, thumbnail)
+            else:
+                # Copy out of the memory map so the cache file isn't held open
+                thumbnail = thumbnail.copy()
+        except Exception as e:
+            print(f"Could not make a thumbnail for {image_path}: {e}")
+            with self.lock:
+                self.futures.pop(image_path, None)
+                self.failed.add(image_path)
+            return
+
+        with self.lock:
+            self.futures.pop(image_path, None)
+            self.memory[image_path] = thumbnail
+            self.memory.move_to_end(image_path)
+            while len(self.memory) > self.max_items:
+                self.memory.popitem(last=False)
+            self.finished.append(image_path)
+
+    def clear(self):
+        """Forget every thumbnail, in memory and on disk"""
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+            self.futures.clear()
+            self.memory.clear()
+            self.failed.clear()
+        self.disk_cache.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self.lock:
+            return {"in_memory": len(self.memory), "pending": len(self.futures), "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def shutdown(self):
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+            self.futures.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
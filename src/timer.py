@@ -1,41 +1,102 @@
-import threading
+import math
+import time
+
+from src import instrumentation
+
+# Wake-ups this close to the deadline count as reaching it (after() rounds to ms)
+DEADLINE_TOLERANCE = 0.005
+
 
 class Timer:
-    def __init__(self):
+    """Session timer driven by root.after against time.monotonic() deadlines.
+
+    Each switch deadline is the previous one plus the interval, so time
+    spent loading images never makes a pose run long. The callback is
+    called on the Tk thread with the seconds remaining (a float) every
+    tick, and with exactly 0 when the interval is over.
+    """
+
+    def __init__(self, root, tick_ms=100):
+        self.root = root
+        self.tick_ms = tick_ms
         self.interval = 5
         self.callback = None
-        self.timer = None
+        self.after_id = None
         self.running = False
+        self.paused = False
+        self.deadline = None  # time.monotonic() of the next switch
+        self.next_wake = None  # When the pending tick was meant to fire
         self.remaining_time = 0
 
     def set_timer_callback(self, callback):
         self.callback = callback
 
     def start(self, interval):
+        self.stop()
         self.interval = interval
         self.remaining_time = interval
+        self.deadline = time.monotonic() + interval
         self.running = True
-        self._start_timer()
+        self.paused = False
+        self._schedule()
 
-    def _start_timer(self):
-        if self.running:
-            self.timer = threading.Timer(1, self._timer_tick)
-            self.timer.start()
+    def _schedule(self):
+        """Wake up on the next tick boundary counted back from the deadline"""
+        now = time.monotonic()
+        tick = self.tick_ms / 1000
+        steps = max(0, math.floor((self.deadline - now) / tick - 1e-6))
+        wake = self.deadline - steps * tick
+        self.next_wake = wake
+        self.after_id = self.root.after(max(1, round((wake - now) * 1000)), self._timer_tick)
 
     def _timer_tick(self):
-        if self.running:
-            self.remaining_time -= 1
-            if self.callback:
-                self.callback(self.remaining_time)
-            if self.remaining_time <= 0:
-                self.remaining_time = self.interval
-            self._start_timer()
+        self.after_id = None
+        if not self.running or self.paused:
+            return
+        now = time.monotonic()
+        # How late the Tk event loop delivered this tick
+        instrumentation.record("timer.jitter", max(0.0, now - self.next_wake) * 1000)
+        self.remaining_time = self.deadline - now
+        if self.remaining_time <= DEADLINE_TOLERANCE:
+            self.remaining_time = 0
+            # Next deadline counts from this one, skipping any we slept through
+            while self.deadline <= now + DEADLINE_TOLERANCE:
+                self.deadline += self.interval
+        if self.callback:
+            self.callback(self.remaining_time)
+        if self.running and not self.paused and self.after_id is None:
+            self._schedule()
+
+    def time_until_switch(self):
+        """Seconds until the next image switch, or None when the timer isn't running"""
+        if not self.running:
+            return None
+        if self.paused:
+            return self.remaining_time
+        return max(0.0, self.deadline - time.monotonic())
+
+    def pause(self):
+        if self.running and not self.paused:
+            self.remaining_time = max(0.0, self.deadline - time.monotonic())
+            self.paused = True
+            self._cancel()
+
+    def resume(self):
+        if self.running and self.paused:
+            self.deadline = time.monotonic() + self.remaining_time
+            self.paused = False
+            self._schedule()
+
+    def _cancel(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
 
     def stop(self):
         self.running = False
-        if self.timer:
-            self.timer.cancel()
+        self.paused = False
+        self._cancel()
 
     def reset(self):
         self.stop()
-        self.start(self.interval)
\ No newline at end of file
+        self.start(self.interval)
@@ -1,25 +1,77 @@
 import tkinter as tk
 from tkinter import filedialog, ttk
-from PIL import Image, ImageTk, ImageOps
+from PIL import Image, ImageTk
 import os
 import time
 import threading
 import random
+import math
+from src.image_loader import prepare_image
+from src.scanner import FolderScanner
+from src.viewport import fit_scale, view_covered
+from src.render_core import render_view
+from src.filters import FilterCache, STUDY_MODES
+from src.animation import AnimationPlayer, FrameDecoder, is_animated
+from src.board import ReferenceBoard, BOARD_SIZES
+from src.browser import ThumbnailBrowser
+from src.thumbnails import ThumbnailCache
+from src.duplicates import DuplicateFinder
+from src.render_cache import RenderCache
+from src.pyramid import ImagePyramid
+from src.progressive import BackgroundRenderer, HIGH_QUALITY_RESAMPLE, PREVIEW_RESAMPLE, UPGRADE_DELAY_MS
+from src import instrumentation
+
+# Extra pixels rendered around the canvas so small drags only move the canvas item
+PAN_MARGIN = 256
+
+# Animation frames are small (viewport sized), so they get a decent filter on the Tk thread
+ANIMATION_RESAMPLE = Image.BILINEAR
+
+# Stages shown on the performance overlay
+HUD_STAGES = ["decode.pixels", "decode.reduce", "decode.orient", "decode.alpha_composite", "filters.apply",
+              "render.resize", "ui.photoimage", "ui.canvas_update", "timer.jitter"]
+HUD_REFRESH_MS = 500
+
+# Images still decoding after this long get a placeholder of the right shape
+PLACEHOLDER_DELAY_MS = 120
+
+# Background work holds off for this long after the last zoom, pan or resize
+INTERACTION_QUIET_SECONDS = 0.3
+
+# While the window is being resized the last render is stretched at most this
+# often, and the view is rendered properly once the size stops changing
+RESIZE_PREVIEW_MS = 33
+RESIZE_SETTLE_MS = 200
+
+DUPLICATE_POLL_MS = 250
 
 class AppUI:
-    def __init__(self, root, image_handler, timer, update_image_callback):
+    def __init__(self, root, image_handler, timer, update_image_callback, prefetcher=None,
+                 disk_cache=None, library_index=None):
         self.root = root
         self.image_handler = image_handler
         self.timer = timer
         self.update_image_callback = update_image_callback
+        self.prefetcher = prefetcher
+        self.disk_cache = disk_cache
+        self.library_index = library_index
+        self.pending_image_path = None
+        self.pending_poll_id = None
+        self.scanner = None
+        self.scan_poll_id = None
+        self.folder_path = None
+        self.restore_path = None  # Image to show once a restored session's scan finds it
+        self.restore_view = None  # (path, zoom, pan_x, pan_y) to reapply when that image is shown
 
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill=tk.BOTH, expand=True)
 
         self.main_frame = tk.Frame(self.notebook)
         self.settings_frame = tk.Frame(self.notebook)
+        self.browse_frame = tk.Frame(self.notebook)
 
         self.notebook.add(self.main_frame, text="Main")
+        self.notebook.add(self.browse_frame, text="Browse")
         self.notebook.add(self.settings_frame, text="Settings")
 
         self.canvas = tk.Canvas(self.main_frame, bg='black')
@@ -52,6 +104,9 @@ class AppUI:
         self.toggle_timer_button = tk.Button(self.control_frame, text="Start Timer", command=self.toggle_timer)
         self.toggle_timer_button.pack(side=tk.LEFT, padx=5)
 
+        self.pause_button = tk.Button(self.control_frame, text="Pause", command=self.toggle_pause, state=tk.DISABLED)
+        self.pause_button.pack(side=tk.LEFT, padx=5)
+
         self.lock_button = tk.Button(self.control_frame, text="Lock Window", command=self.lock_window)
         self.lock_button.pack(side=tk.LEFT, padx=5)
 
@@ -62,6 +117,19 @@ class AppUI:
         self.monochrome_mode = False
         self.monochrome_button = tk.Button(self.control_frame, text="Monochrome: Off", command=self.toggle_monochrome)
         self.monochrome_button.pack(side=tk.LEFT, padx=5)
+
+        self.flip_mode = False
+        self.flip_button = tk.Button(self.control_frame, text="Flip: Off", command=self.toggle_flip)
+        self.flip_button.pack(side=tk.LEFT, padx=5)
+
+        self.study_label = tk.Label(self.control_frame, text="Study:")
+        self.study_label.pack(side=tk.LEFT, padx=5)
+
+        self.study_var = tk.StringVar(value="None")
+        self.study_dropdown = ttk.Combobox(self.control_frame, textvariable=self.study_var,
+                                           values=list(STUDY_MODES), width=8, state="readonly")
+        self.study_dropdown.pack(side=tk.LEFT, padx=5)
+        self.study_dropdown.bind("<<ComboboxSelected>>", self.on_filters_changed)
         
         # Add zoom dropdown menu
         self.zoom_label = tk.Label(self.control_frame, text="Zoom:")
@@ -74,30 +142,46 @@ class AppUI:
         self.zoom_dropdown.pack(side=tk.LEFT, padx=5)
         self.zoom_dropdown.bind("<<ComboboxSelected>>", self.on_zoom_selected)
 
+        # Several references side by side instead of one image
+        self.board_label = tk.Label(self.control_frame, text="Board:")
+        self.board_label.pack(side=tk.LEFT, padx=5)
+
+        self.board_var = tk.StringVar(value=BOARD_SIZES[0])
+        self.board_dropdown = ttk.Combobox(self.control_frame, textvariable=self.board_var,
+                                           values=BOARD_SIZES, width=4, state="readonly")
+        self.board_dropdown.pack(side=tk.LEFT, padx=5)
+        self.board_dropdown.bind("<<ComboboxSelected>>", self.on_board_selected)
+
         self.additional_frame = tk.Frame(self.main_frame)
         self.additional_frame.pack(fill=tk.X, pady=5)
 
         self.image_id = None
         self.original_image = None
+        self.original_pyramid = None  # Mip-map levels of original_image
+        self.filter_cache = FilterCache()  # Filtered pyramids by (image, filter chain)
         self.resize_after_id = None
+        self.resize_preview_id = None
+        self.resize_preview_photo = None  # Keeps the stretched preview alive while shown
+        self.canvas_size = None  # Last size reported by <Configure>
+        self.rendered_canvas_size = None  # Canvas size the current render was made for
         self.window_locked = False
 
-        self.root.bind("<Configure>", self.on_resize)
-
-        # Settings tab
-        self.settings_label = tk.Label(self.settings_frame, text="Settings", font=("Arial", 16))
-        self.settings_label.pack(pady=10)
+        # Only the canvas: the root also gets <Configure> for moves and for every child widget
+        self.canvas.bind("<Configure>", self.on_resize)
 
+        # Settings tab widgets are built the first time the tab is opened; their
+        # variables exist from the start because the rest of the UI reads them
+        self.settings_built = False
         self.display_method = tk.StringVar(value="name")
+        self.include_subfolders = tk.BooleanVar(value=False)
+        self.hide_duplicates = tk.BooleanVar(value=False)
+        self.duplicate_finder = None
+        self.duplicate_poll_id = None
+        self.show_hud = tk.BooleanVar(value=False)
+        self.hud_id = None
+        self.hud_after_id = None
 
-        self.name_radio = tk.Radiobutton(self.settings_frame, text="Sort by name", variable=self.display_method, value="name")
-        self.name_radio.pack(anchor=tk.W, padx=10)
-
-        self.random_radio = tk.Radiobutton(self.settings_frame, text="Randomize", variable=self.display_method, value="random")
-        self.random_radio.pack(anchor=tk.W, padx=10)
-
-        self.save_settings_button = tk.Button(self.settings_frame, text="Save Settings", command=self.save_settings)
-        self.save_settings_button.pack(pady=10)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
         self.zoom_factor = 1.0
         self.pan_x = 0
@@ -105,6 +189,10 @@ class AppUI:
         self.drag_start_x = 0
         self.drag_start_y = 0
         self.is_dragging = False
+        self.drag_frame_id = None
+        self.rendered_rect = None  # Canvas rectangle covered by the current render
+        self.rendered_pan = (0, 0)  # Pan offset the current render was made for
+        self.last_interaction = 0.0  # time.monotonic() of the last zoom, pan or resize
         
         self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)  # Windows
         self.canvas.bind("<Button-4>", self.on_mouse_wheel)    # Linux scroll up
@@ -113,8 +201,23 @@ class AppUI:
         self.canvas.bind("<B1-Motion>", self.on_drag_motion)
         self.canvas.bind("<ButtonRelease-1>", self.on_drag_end)
 
-        self.zoom_cache = {}  # Cache for different zoom levels
-        self.max_cache_entries = 10  # Limit cache size
+        self.render_cache = RenderCache()  # Finished renders, shared across images
+        self.original_image_key = None  # Identity of original_image for cache keys
+        self.quality_renderer = BackgroundRenderer(root)
+        self.upgrade_after_id = None
+        self.displayed_key = None  # Render cache key of what is on the canvas
+        self.displayed_image = None  # PIL image and canvas position of what is on the canvas
+        self.displayed_position = None
+        self.animation = None  # AnimationPlayer while an animated image is shown
+        self.board = None  # ReferenceBoard while the board is shown
+        self.browser = None  # ThumbnailBrowser, built when the Browse tab is first opened
+        self.thumbnails = None
+
+        instrumentation.register_stats("render_cache", self.render_cache.stats)
+        if self.prefetcher:
+            instrumentation.register_stats("prefetch", self.prefetcher.stats)
+        if self.disk_cache:
+            instrumentation.register_stats("disk_cache", self.disk_cache.counters)
 
         self.zoom_presets = [1.0, 1.25, 1.5, 2.0, 3.0]  # The 5 zoom presets
         self.current_zoom_index = 0  # Start at 1x zoom (index 0)
@@ -123,14 +226,100 @@ class AppUI:
     def select_folder(self):
         folder_path = filedialog.askdirectory()
         if folder_path:
-            self.image_handler.load_images(folder_path)
-            self.update_image_callback()
+            # A folder picked by hand replaces whatever the session was restoring
+            self.restore_path = None
+            self.restore_view = None
+            self.start_folder_scan(folder_path)
+
+    def start_folder_scan(self, folder_path):
+        """Scan a folder in the background, showing the first image as soon as it is found"""
+        if self.scanner:
+            self.scanner.stop()
+        if self.scan_poll_id:
+            self.root.after_cancel(self.scan_poll_id)
+        self.stop_duplicate_search()
+        self.image_handler.clear_images()
+        if self.prefetcher:
+            self.prefetcher.clear()
+        self.folder_path = folder_path
+
+        self.scanner = FolderScanner(folder_path, recursive=self.include_subfolders.get(),
+                                     library_index=self.library_index)
+        self.scanner.start()
+        self.poll_folder_scan()
+
+    def poll_folder_scan(self):
+        """Move newly found images from the scanner into the image handler"""
+        self.scan_poll_id = None
+        scanner = self.scanner
+        batch = scanner.drain()
+        if batch:
+            had_images = self.image_handler.has_images()
+            self.image_handler.add_images(batch)
+            if self.browser:
+                self.browser.refresh()
+            if self.restore_path is not None:
+                # Keep the startup preview up until the restored image turns up
+                if self.restore_path in batch:
+                    self.image_handler.select_image(self.restore_path)
+                    self.restore_path = None
+                    self.update_image_callback()
+            elif not had_images:
+                self.update_image_callback()
+        if scanner.finished():
+            print(f"Found {scanner.found} images in {scanner.folder_path}")
+            self.scanner = None
+            if self.restore_path is not None:
+                # The restored image is gone; start from the first one instead
+                self.restore_path = None
+                self.restore_view = None
+                self.update_image_callback()
+            if self.hide_duplicates.get():
+                self.start_duplicate_search()
+        else:
+            self.scan_poll_id = self.root.after(50, self.poll_folder_scan)
+
+    def on_hide_duplicates_toggled(self):
+        if self.hide_duplicates.get():
+            self.start_duplicate_search()
+        else:
+            self.stop_duplicate_search()
+            self.image_handler.hide_images([])
+
+    def start_duplicate_search(self):
+        """Hash the listing in the background and hide near-duplicates once it is done"""
+        self.stop_duplicate_search()
+        if self.scanner or not self.image_handler.has_images():
+            return  # Started when the scan finishes
+        self.duplicate_finder = DuplicateFinder(list(self.image_handler.images), self.library_index)
+        self.duplicate_finder.start()
+        self.duplicate_poll_id = self.root.after(DUPLICATE_POLL_MS, self.poll_duplicate_search)
+
+    def poll_duplicate_search(self):
+        finder = self.duplicate_finder
+        if not finder.done:
+            self.duplicate_poll_id = self.root.after(DUPLICATE_POLL_MS, self.poll_duplicate_search)
+            return
+        self.duplicate_poll_id = None
+        self.duplicate_finder = None
+        self.image_handler.hide_images(finder.hidden)
+        print(f"Hiding {len(finder.hidden)} near-duplicates in {finder.groups} groups "
+              f"({finder.hashed} images hashed)")
+
+    def stop_duplicate_search(self):
+        if self.duplicate_finder:
+            self.duplicate_finder.stop()
+            self.duplicate_finder = None
+        if self.duplicate_poll_id:
+            self.root.after_cancel(self.duplicate_poll_id)
+            self.duplicate_poll_id = None
 
     def toggle_timer(self):
         if self.timer_running:
             self.timer.stop()
             self.timer_running = False
             self.toggle_timer_button.config(text="Start Timer")
+            self.pause_button.config(text="Pause", state=tk.DISABLED)
         else:
             try:
                 # Convert minutes to seconds, allow for float values
@@ -150,10 +339,21 @@ class AppUI:
                 self.timer.start(seconds)
                 self.timer_running = True
                 self.toggle_timer_button.config(text="Stop Timer")
+                self.pause_button.config(text="Pause", state=tk.NORMAL)
             except ValueError:
                 # Handle invalid input
                 print("Please enter a valid number of minutes")
 
+    def toggle_pause(self):
+        if not self.timer_running:
+            return
+        if self.timer.paused:
+            self.timer.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            self.timer.pause()
+            self.pause_button.config(text="Resume")
+
     def start_timer(self):
         interval = int(self.timer_entry.get())
         self.progress['maximum'] = interval
@@ -170,54 +370,107 @@ class AppUI:
         return f"{minutes}:{remaining_seconds:02d}"
 
     def update_progress(self, value):
+        # Sub-second values keep the bar moving smoothly
         self.progress['value'] = value
         
-        # Update the progress bar text to show the formatted time
-        formatted_time = self.format_time(value)
+        # Update the progress bar text to show the formatted time (whole seconds, counting down)
+        formatted_time = self.format_time(math.ceil(value))
         
         # Then update it here:
         self.time_label.config(text=formatted_time)
 
     def display_image(self, image_path):
+        """Show an image, using the prefetcher's decoded copy when available"""
+        if self.board:
+            # The board starts at the current image instead
+            self.show_board()
+            return
+        if self.pending_poll_id:
+            self.root.after_cancel(self.pending_poll_id)
+            self.pending_poll_id = None
+        self.stop_animation()
+        self.pending_image_path = image_path
+
+        if self.prefetcher is None:
+            try:
+                prepared = prepare_image(image_path)
+            except Exception as e:
+                self.quarantine_and_skip(image_path, e)
+                return
+            self.show_prepared_image(prepared)
+            return
+
+        # Counted once here; the polls below don't count as requests
+        self.prefetcher.request(image_path)
+        self._wait_for_prepared(image_path)
+        if self.pending_poll_id:
+            self.root.after(PLACEHOLDER_DELAY_MS, lambda: self.show_placeholder(image_path))
+
+    def show_placeholder(self, image_path):
+        """Mark out where a slow image will appear, using its upright size from the index"""
+        if image_path != self.pending_image_path or not self.pending_poll_id or not self.library_index:
+            return  # Already shown, or superseded
+        size = self.library_index.get_display_size(image_path)
+        canvas_width, canvas_height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if not size or canvas_width <= 1 or canvas_height <= 1:
+            return
+        scale = fit_scale(size, (canvas_width, canvas_height))
+        width, height = size[0] * scale, size[1] * scale
+        left, top = (canvas_width - width) / 2, (canvas_height - height) / 2
+        # The previous image is gone as far as zooming and panning are concerned
+        self.original_image = None
+        self.rendered_rect = None
+        if self.image_id:
+            self.canvas.delete(self.image_id)
+        self.image_id = self.canvas.create_rectangle(left, top, left + width, top + height,
+                                                     fill="#202020", outline="")
+
+    def _wait_for_prepared(self, image_path):
+        """Poll the prefetcher without blocking the Tk event loop"""
+        self.pending_poll_id = None
+        if image_path != self.pending_image_path:
+            return  # Another image was requested in the meantime
+        future = self.prefetcher.future(image_path)
+        if not future.done():
+            self.pending_poll_id = self.root.after(15, lambda: self._wait_for_prepared(image_path))
+            return
+        try:
+            prepared = future.result()
+        except Exception as e:
+            self.prefetcher.discard(image_path)
+            self.quarantine_and_skip(image_path, e)
+            return
+        self.show_prepared_image(prepared)
+
+    def quarantine_and_skip(self, image_path, reason):
+        """Remove an image that failed to decode and show the one after it"""
+        self.image_handler.quarantine_image(image_path, reason)
+        if self.library_index:
+            self.library_index.mark_invalid(image_path)
+        self.update_image_callback()
+
+    def show_prepared_image(self, prepared):
+        """Put an already decoded and prepared image on the canvas"""
         try:
-            # Clear the zoom cache when loading a new image
-            self.zoom_cache.clear()
-            
             # Reset zoom and pan values
             self.current_zoom_index = 0
             self.zoom_factor = self.zoom_presets[self.current_zoom_index]
             self.pan_x = 0
             self.pan_y = 0
+            if self.restore_view and self.restore_view[0] == self.pending_image_path:
+                # First image of a restored session comes back as it was left
+                _, zoom_factor, self.pan_x, self.pan_y = self.restore_view
+                if zoom_factor in self.zoom_presets:
+                    self.current_zoom_index = self.zoom_presets.index(zoom_factor)
+                    self.zoom_factor = zoom_factor
+            self.restore_view = None
             
             # Reset zoom dropdown to match
             self.zoom_var.set(f"{int(self.zoom_factor * 100)}%")
             
-            # Load the original image 
-            original = Image.open(image_path)
-            
-            # Check for alpha channel
-            if original.mode == 'RGBA':
-                # Create a white background
-                background = Image.new('RGB', original.size, (255, 255, 255))
-                # Composite the image onto the background
-                original = Image.alpha_composite(background.convert('RGBA'), original).convert('RGB')
-            
-            # Check if image needs to be resized for performance
-            width, height = original.size
-            max_dimension = max(width, height)
-            
-            if max_dimension > 2000:
-                # Calculate the scaling factor to reduce to 1500px max dimension
-                scale_factor = 1500 / max_dimension
-                new_width = int(width * scale_factor)
-                new_height = int(height * scale_factor)
-                
-                # Resize the image while maintaining aspect ratio
-                self.original_image = original.resize((new_width, new_height), Image.NEAREST)
-                print(f"Resized large image from {width}x{height} to {new_width}x{new_height} for performance")
-            else:
-                # Use the original image if it's already smaller than the threshold
-                self.original_image = original
+            self.original_image = prepared
+            self.original_pyramid = ImagePyramid(prepared)
+            self.original_image_key = (self.pending_image_path, prepared.size)
             
             # Delete existing image on canvas if any
             if self.image_id:
@@ -227,18 +480,275 @@ class AppUI:
             # Force reference clearing for any previous image
             self.image = None
             
-            # Pre-cache all zoom levels
-            self.precache_zoom_levels()
-                
             # Now resize with fresh state
             self.resize_image()
+
+            # The still first frame stays up until playback has frames ready
+            if is_animated(self.pending_image_path):
+                self.start_animation(self.pending_image_path)
         except Exception as e:
-            print(f"Error loading image {image_path}: {e}")
+            print(f"Error displaying image {self.pending_image_path}: {e}")
+
+    def start_animation(self, image_path):
+        """Play an animated GIF/WebP, decoding frames ahead at viewport size"""
+        self.stop_animation()
+        canvas_size = (max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height()))
+        decoder = FrameDecoder(image_path, canvas_size)
+        self.animation = AnimationPlayer(self.root, decoder, self.prepare_animation_frame,
+                                         self.show_animation_frame)
+        self.animation.start()
+
+    def stop_animation(self):
+        if self.animation:
+            self.animation.stop()
+            self.animation = None
+
+    def prepare_animation_frame(self, frame):
+        """Render a decoded frame for the current view; the same frames serve every zoom level"""
+        canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        rendered, position = render_view(frame, canvas_size, self.zoom_factor, (self.pan_x, self.pan_y),
+                                         self.filter_chain(), ANIMATION_RESAMPLE, margin=PAN_MARGIN)
+        if rendered is None:
+            return None
+        with instrumentation.span("ui.photoimage"):
+            photo = ImageTk.PhotoImage(rendered)
+        return rendered, position, photo, self.view_key(*canvas_size)
+
+    def show_animation_frame(self, prepared):
+        if prepared is not None and prepared[3] != self.view_key(self.canvas.winfo_width(), self.canvas.winfo_height()):
+            # Prepared ahead for a view that has changed since
+            prepared = self.prepare_animation_frame(self.animation.current)
+        if prepared is None:
+            return
+        rendered, position, photo, _ = prepared
+        self.display_processed_image(rendered, position, photo)
+
+    def note_interaction(self):
+        self.last_interaction = time.monotonic()
+
+    def is_interacting(self):
+        """True while the user is zooming, panning or resizing (or just stopped)"""
+        return self.is_dragging or time.monotonic() - self.last_interaction < INTERACTION_QUIET_SECONDS
+
+    def session_state(self):
+        """What restore_session needs to bring this session back"""
+        handler = self.image_handler
+        shuffle_seed = handler.shuffle.seed if handler.shuffle is not None else handler.shuffle_seed
+        return {
+            "folder": self.folder_path,
+            "recursive": self.include_subfolders.get(),
+            "hide_duplicates": self.hide_duplicates.get(),
+            "image": handler.get_current_image(),
+            "display_method": handler.display_method,
+            "shuffle_seed": shuffle_seed,
+            "timer_minutes": self.timer_entry.get(),
+            "zoom": self.zoom_factor,
+            "pan": [self.pan_x, self.pan_y],
+            "preview_position": self.displayed_canvas_position() if self.displayed_image else None,
+        }
+
+    def displayed_canvas_position(self):
+        """Where the displayed render sits on the canvas now; drags move it without re-rendering"""
+        return [self.displayed_position[0] + self.pan_x - self.rendered_pan[0],
+                self.displayed_position[1] + self.pan_y - self.rendered_pan[1]]
+
+    def save_preview(self, path):
+        """Save what is on the canvas as a PNG for the next start-up; True if written"""
+        if self.displayed_image is None:
+            return False
+        image = self.displayed_image
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")  # Renders from the raw cache are RGBX
+        try:
+            image.save(path, "PNG", compress_level=1)
+            return True
+        except (OSError, ValueError) as e:
+            print(f"Could not save session preview: {e}")
+            return False
+
+    def show_startup_preview(self, photo, position):
+        """Show last session's view (a Tk PhotoImage) until the first real image is ready"""
+        self.image = photo
+        self.image_id = self.canvas.create_image(position[0], position[1], anchor=tk.NW, image=photo)
+
+    def restore_session(self, session):
+        """Bring back the folder, image, timer value, zoom and order of a saved session"""
+        if session.get("timer_minutes"):
+            self.timer_entry.delete(0, tk.END)
+            self.timer_entry.insert(0, session["timer_minutes"])
+        display_method = session.get("display_method")
+        if display_method:
+            self.display_method.set(display_method)
+            self.image_handler.display_method = display_method
+        if session.get("shuffle_seed") is not None:
+            self.image_handler.set_shuffle_seed(session["shuffle_seed"])
+        self.include_subfolders.set(bool(session.get("recursive")))
+        self.hide_duplicates.set(bool(session.get("hide_duplicates")))
+
+        folder = session.get("folder")
+        if not folder or not os.path.isdir(folder):
+            return
+        image_path = session.get("image")
+        if image_path:
+            self.restore_path = image_path
+            pan_x, pan_y = session.get("pan") or (0, 0)
+            self.restore_view = (image_path, session.get("zoom", 1.0), pan_x, pan_y)
+        self.start_folder_scan(folder)
+
+    def on_board_selected(self, event=None):
+        """Switch between the single image view and a board of several images"""
+        count = self.board_var.get()
+        if count == BOARD_SIZES[0]:
+            if self.board:
+                self.board.shutdown()
+                self.board = None
+                self.update_image_callback()
+            return
+        if not self.board:
+            # Leave the single view: its image and any pending work go away
+            if self.pending_poll_id:
+                self.root.after_cancel(self.pending_poll_id)
+                self.pending_poll_id = None
+            self.pending_image_path = None
+            self.stop_animation()
+            self.quality_renderer.cancel()
+            if self.image_id:
+                self.canvas.delete(self.image_id)
+                self.image_id = None
+            self.original_image = None
+            self.rendered_rect = None
+            self.displayed_image = None
+            self.board = ReferenceBoard(self.root, self.canvas, self.render_cache, self.filter_chain,
+                                        self.zoom_presets, self.disk_cache, filter_cache=self.filter_cache)
+        self.show_board()
+
+    def show_board(self):
+        """Fill the board with the current image and the ones after it"""
+        handler = self.image_handler
+        if not handler.has_images():
+            return
+        # Stepped like the single view, so shuffles and hidden duplicates are respected
+        paths = []
+        index = handler.current_image_index
+        for _ in range(int(self.board_var.get())):
+            path = handler.images[index]
+            if path in paths:
+                break  # Fewer images than cells
+            paths.append(path)
+            index = handler.step_index(index, 1)
+        self.board.show(paths)
 
-    def on_resize(self, event=None):
+    def on_resize(self, event):
+        """Coalesce a storm of canvas size changes into one render at the final size"""
+        size = (event.width, event.height)
+        if size == self.canvas_size:
+            return
+        self.canvas_size = size
+        self.note_interaction()
+        if not self.resize_preview_id:
+            self.resize_preview_id = self.root.after(RESIZE_PREVIEW_MS, self.show_resize_preview)
         if self.resize_after_id:
             self.root.after_cancel(self.resize_after_id)
-        self.resize_after_id = self.root.after(200, self.resize_image)
+        self.resize_after_id = self.root.after(RESIZE_SETTLE_MS, self.finish_resize)
+
+    def show_resize_preview(self):
+        """Stretch the last render to the new canvas size, without touching the source image"""
+        self.resize_preview_id = None
+        if (self.board or self.animation or not self.original_image or not self.image_id or not self.rendered_rect
+                or not self.rendered_canvas_size or self.displayed_image is None):
+            return
+        old_width, old_height = self.rendered_canvas_size
+        new_width, new_height = self.canvas_size
+        if new_width <= 1 or new_height <= 1:
+            return
+        image_size = self.original_image.size
+        ratio = fit_scale(image_size, self.canvas_size) / fit_scale(image_size, self.rendered_canvas_size)
+
+        # The image centre follows the canvas centre; the render scales around it
+        old_center_x = old_width / 2 + self.rendered_pan[0]
+        old_center_y = old_height / 2 + self.rendered_pan[1]
+        new_center_x = new_width / 2 + self.pan_x
+        new_center_y = new_height / 2 + self.pan_y
+        x0, y0, x1, y1 = self.rendered_rect
+        left = new_center_x + (x0 - old_center_x) * ratio
+        top = new_center_y + (y0 - old_center_y) * ratio
+
+        if abs(ratio - 1) < 0.005:
+            # Same scale (e.g. only the unconstrained side changed): just move it
+            self.canvas.coords(self.image_id, round(left), round(top))
+            return
+
+        # Only the part that lands on the canvas is scaled, with the cheapest filter
+        dest = (max(0, math.floor(left)), max(0, math.floor(top)),
+                min(new_width, math.ceil(left + (x1 - x0) * ratio)),
+                min(new_height, math.ceil(top + (y1 - y0) * ratio)))
+        if dest[2] <= dest[0] or dest[3] <= dest[1]:
+            return
+        width, height = self.displayed_image.size
+        source_box = (max(0.0, (dest[0] - left) / ratio), max(0.0, (dest[1] - top) / ratio),
+                      min(float(width), (dest[2] - left) / ratio), min(float(height), (dest[3] - top) / ratio))
+        with instrumentation.span("render.resize", resample="resize_preview"):
+            stretched = self.displayed_image.resize((dest[2] - dest[0], dest[3] - dest[1]),
+                                                    PREVIEW_RESAMPLE, box=source_box)
+        with instrumentation.span("ui.photoimage"):
+            self.resize_preview_photo = ImageTk.PhotoImage(stretched)
+        self.place_canvas_image(self.resize_preview_photo, dest[0], dest[1])
+
+    def finish_resize(self):
+        """Render once at the final size, or just move the last render if its scale still fits"""
+        self.resize_after_id = None
+        if self.resize_preview_id:
+            self.root.after_cancel(self.resize_preview_id)
+            self.resize_preview_id = None
+        if self.board:
+            self.board.layout()
+            return
+        if self.reuse_render_after_resize():
+            self.resize_preview_photo = None
+            return
+        self.resize_image()
+        self.resize_preview_photo = None
+
+    def reuse_render_after_resize(self):
+        """Shift the current render to the new canvas if the fitted image size hasn't changed"""
+        if (self.animation or not self.original_image or not self.rendered_rect
+                or not self.rendered_canvas_size or self.displayed_image is None or not self.canvas_size):
+            return False
+        image_size = self.original_image.size
+        old_scale = fit_scale(image_size, self.rendered_canvas_size) * self.zoom_factor
+        new_scale = fit_scale(image_size, self.canvas_size) * self.zoom_factor
+        if (round(image_size[0] * old_scale), round(image_size[1] * old_scale)) != \
+                (round(image_size[0] * new_scale), round(image_size[1] * new_scale)):
+            return False
+
+        # Same pixels, only centred on a different point
+        shift_x = round((self.canvas_size[0] - self.rendered_canvas_size[0]) / 2)
+        shift_y = round((self.canvas_size[1] - self.rendered_canvas_size[1]) / 2)
+        x0, y0, x1, y1 = self.rendered_rect
+        moved_rect = (x0 + shift_x, y0 + shift_y, x1 + shift_x, y1 + shift_y)
+        if not view_covered(moved_rect, self.rendered_pan, image_size, self.canvas_size,
+                            self.zoom_factor, self.pan_x, self.pan_y):
+            return False  # A bigger canvas shows parts that were never rendered
+
+        self.rendered_rect = moved_rect
+        self.rendered_canvas_size = self.canvas_size
+        self.displayed_position = (moved_rect[0], moved_rect[1])
+        with instrumentation.span("ui.resize_reuse", width=self.canvas_size[0], height=self.canvas_size[1]):
+            self.place_canvas_image(self.image, moved_rect[0] + self.pan_x - self.rendered_pan[0],
+                                    moved_rect[1] + self.pan_y - self.rendered_pan[1])
+        # An upgrade that was rendering for the old size gets dropped, so start another
+        if self.displayed_key and self.displayed_key[-1] != HIGH_QUALITY_RESAMPLE and not self.upgrade_after_id:
+            self.upgrade_after_id = self.root.after(UPGRADE_DELAY_MS, self.start_quality_upgrade)
+        return True
+
+    def place_canvas_image(self, photo, x, y):
+        """Replace the canvas image item, keeping the HUD on top"""
+        with instrumentation.span("ui.canvas_update"):
+            if self.image_id:
+                self.canvas.delete(self.image_id)
+            self.image_id = self.canvas.create_image(x, y, anchor=tk.NW, image=photo)
+            if self.hud_id:
+                self.canvas.tag_raise(self.hud_id)
 
     def lock_window(self):
         self.window_locked = not self.window_locked
@@ -260,25 +770,203 @@ class AppUI:
                 self.image_handler.images.sort()
         print(f"Settings saved: Display method = {display_method}")
 
+    def toggle_hud(self, event=None):
+        self.show_hud.set(not self.show_hud.get())
+        self.on_hud_toggled()
+
+    def on_hud_toggled(self):
+        """Show or hide the performance overlay (recording starts with it)"""
+        if self.show_hud.get():
+            instrumentation.set_enabled(True)
+            self.update_hud()
+        else:
+            if self.hud_after_id:
+                self.root.after_cancel(self.hud_after_id)
+                self.hud_after_id = None
+            if self.hud_id:
+                self.canvas.delete(self.hud_id)
+                self.hud_id = None
+
+    def update_hud(self):
+        """Redraw the overlay with recent stage timings and cache hit rates"""
+        report = instrumentation.summary()
+        lines = []
+        for name in HUD_STAGES:
+            stage = report["stages"].get(name)
+            if stage:
+                lines.append(f"{name:<24}{stage['p50_ms']:>7.1f} {stage['p95_ms']:>7.1f} ms")
+        for name, stats in report["stats"].items():
+            if "hit_rate" in stats:
+                lines.append(f"{name + ' hits':<24}{stats['hit_rate']:>7.0%}")
+        text = "\n".join([f"{'stage':<24}{'p50':>7} {'p95':>7}"] + lines)
+
+        if self.hud_id:
+            self.canvas.itemconfig(self.hud_id, text=text)
+        else:
+            self.hud_id = self.canvas.create_text(8, 8, anchor=tk.NW, text=text, fill="yellow",
+                                                  font=("Courier", 9))
+        self.canvas.tag_raise(self.hud_id)
+        self.hud_after_id = self.root.after(HUD_REFRESH_MS, self.update_hud)
+
+    def export_trace(self):
+        """Save recorded timings as a Chrome trace-event file"""
+        if not instrumentation.enabled:
+            print("Performance recording is off; enable the overlay (or SKETCH_PROFILE=1) first")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Trace files", "*.json")])
+        if path:
+            count = instrumentation.export_chrome_trace(path)
+            print(f"Exported {count} trace events to {path}")
+
+    def shutdown(self):
+        """Stop background work before the window goes away"""
+        if self.scanner:
+            self.scanner.stop()
+        self.stop_duplicate_search()
+        self.quality_renderer.shutdown()
+        self.stop_animation()
+        if self.board:
+            self.board.shutdown()
+        if self.thumbnails:
+            self.thumbnails.shutdown()
+
+    def on_tab_changed(self, event=None):
+        """Refresh settings info when the Settings tab is opened"""
+        selected = self.notebook.select()
+        if selected == str(self.browse_frame):
+            if not self.browser:
+                self.build_browse_tab()
+            self.browser.show()
+        elif self.browser:
+            self.browser.hide()
+        if selected == str(self.settings_frame):
+            if not self.settings_built:
+                self.build_settings_tab()
+            self.update_cache_label()
+
+    def build_browse_tab(self):
+        """Create the thumbnail browser (deferred, like the Settings tab)"""
+        self.thumbnails = ThumbnailCache()
+        self.browser = ThumbnailBrowser(self.browse_frame, self.root, self.image_handler, self.thumbnails,
+                                        self.on_thumbnail_selected)
+        instrumentation.register_stats("thumbnails", self.thumbnails.stats)
+
+    def on_thumbnail_selected(self, position):
+        """Jump to a clicked thumbnail and go back to the main view"""
+        self.image_handler.current_image_index = position
+        self.notebook.select(self.main_frame)
+        self.update_image_callback()
+
+    def build_settings_tab(self):
+        """Create the Settings tab widgets (deferred until the tab is first shown)"""
+        self.settings_built = True
+        self.settings_label = tk.Label(self.settings_frame, text="Settings", font=("Arial", 16))
+        self.settings_label.pack(pady=10)
+
+        self.name_radio = tk.Radiobutton(self.settings_frame, text="Sort by name", variable=self.display_method, value="name")
+        self.name_radio.pack(anchor=tk.W, padx=10)
+
+        self.mtime_radio = tk.Radiobutton(self.settings_frame, text="Sort by date modified", variable=self.display_method, value="mtime")
+        self.mtime_radio.pack(anchor=tk.W, padx=10)
+
+        self.size_radio = tk.Radiobutton(self.settings_frame, text="Sort by file size", variable=self.display_method, value="size")
+        self.size_radio.pack(anchor=tk.W, padx=10)
+
+        self.dimensions_radio = tk.Radiobutton(self.settings_frame, text="Sort by dimensions", variable=self.display_method, value="dimensions")
+        self.dimensions_radio.pack(anchor=tk.W, padx=10)
+
+        self.random_radio = tk.Radiobutton(self.settings_frame, text="Randomize", variable=self.display_method, value="random")
+        self.random_radio.pack(anchor=tk.W, padx=10)
+
+        self.subfolders_check = tk.Checkbutton(self.settings_frame, text="Include subfolders", variable=self.include_subfolders)
+        self.subfolders_check.pack(anchor=tk.W, padx=10)
+
+        self.duplicates_check = tk.Checkbutton(self.settings_frame, text="Hide near-duplicates",
+                                               variable=self.hide_duplicates, command=self.on_hide_duplicates_toggled)
+        self.duplicates_check.pack(anchor=tk.W, padx=10)
+
+        self.save_settings_button = tk.Button(self.settings_frame, text="Save Settings", command=self.save_settings)
+        self.save_settings_button.pack(pady=10)
+
+        # Display cache info
+        self.cache_label = tk.Label(self.settings_frame, text="", justify=tk.LEFT)
+        self.cache_label.pack(anchor=tk.W, padx=10)
+
+        self.clear_cache_button = tk.Button(self.settings_frame, text="Clear Caches", command=self.clear_caches)
+        self.clear_cache_button.pack(anchor=tk.W, padx=10, pady=5)
+
+        # Performance diagnostics
+        self.hud_check = tk.Checkbutton(self.settings_frame, text="Performance overlay (F3)", variable=self.show_hud,
+                                        command=self.on_hud_toggled)
+        self.hud_check.pack(anchor=tk.W, padx=10)
+
+        self.export_trace_button = tk.Button(self.settings_frame, text="Export Trace...", command=self.export_trace)
+        self.export_trace_button.pack(anchor=tk.W, padx=10, pady=5)
+
+    def update_cache_label(self):
+        if not self.settings_built:
+            return
+        render = self.render_cache.stats()
+        text = (f"Render cache: {render['entries']} renders, {render['bytes'] / (1024 * 1024):.0f} of "
+                f"{render['budget_bytes'] / (1024 * 1024):.0f} MB, {render['hit_rate']:.0%} hits, "
+                f"{render['evictions']} evictions")
+        if self.disk_cache:
+            stats = self.disk_cache.stats()
+            text = (f"Image cache: {stats['entries']} images, {stats['bytes'] / (1024 * 1024):.0f} of "
+                    f"{stats['max_bytes'] / (1024 * 1024):.0f} MB\n{stats['path']}\n" + text)
+        else:
+            text = "Image cache: disabled\n" + text
+        self.cache_label.config(text=text)
+
+    def clear_caches(self):
+        if self.disk_cache:
+            self.disk_cache.clear()
+            print("Image cache cleared")
+        self.render_cache.clear()
+        self.filter_cache.clear()
+        if self.thumbnails:
+            self.thumbnails.clear()
+        self.update_cache_label()
+
     def toggle_monochrome(self):
         self.monochrome_mode = not self.monochrome_mode
         self.monochrome_button.config(text=f"Monochrome: {'On' if self.monochrome_mode else 'Off'}")
-        
+        self.on_filters_changed()
+
+    def toggle_flip(self):
+        self.flip_mode = not self.flip_mode
+        self.flip_button.config(text=f"Flip: {'On' if self.flip_mode else 'Off'}")
+        self.on_filters_changed()
+
+    def on_filters_changed(self, event=None):
         # Refresh the current image to apply the effect
-        if self.original_image:
+        if self.board:
+            self.board.render_all()
+        elif self.original_image:
             self.resize_image()
     
-    def process_image(self, img):
-        """Apply image processing based on current settings"""
-        if self.monochrome_mode:
-            return ImageOps.grayscale(img)
-        return img
+    def filter_chain(self):
+        """Names of the filters currently applied, used in cache keys"""
+        chain = []
+        if self.flip_mode:
+            chain.append("flip")
+        study = STUDY_MODES.get(self.study_var.get())
+        if study:
+            chain.append(study)
+        elif self.monochrome_mode:
+            chain.append("grayscale")
+        return tuple(chain)
 
     # Add these new methods for zoom and pan
     def on_mouse_wheel(self, event):
         """Handle mouse wheel events with discrete zoom presets"""
+        if self.board:
+            self.note_interaction()
+            self.board.on_mouse_wheel(event)
+            return
         if not self.original_image:
             return
+        self.note_interaction()
         
         # Store old zoom factor for ratio calculation
         old_zoom = self.zoom_factor
@@ -329,13 +1017,19 @@ class AppUI:
 
     def on_drag_start(self, event):
         """Begin dragging to pan the image - always allowed but with limits"""
+        if self.board:
+            self.board.on_drag_start(event)
         self.is_dragging = True
         self.drag_start_x = event.x
         self.drag_start_y = event.y
 
     def on_drag_motion(self, event):
         """Pan the image as the mouse is dragged with incremental rendering"""
-        if self.is_dragging:
+        if self.board:
+            self.note_interaction()
+            self.board.on_drag_motion(event)
+        elif self.is_dragging:
+            self.note_interaction()
             # Calculate the distance moved
             dx = event.x - self.drag_start_x
             dy = event.y - self.drag_start_y
@@ -363,28 +1057,49 @@ class AppUI:
             self.drag_start_x = event.x
             self.drag_start_y = event.y
             
-            # Use very fast mode during active dragging
-            self.resize_image(very_fast_mode=True)
-            
-            # Cancel any pending quality upgrades
-            if hasattr(self, 'drag_fast_quality_id') and self.drag_fast_quality_id:
-                self.root.after_cancel(self.drag_fast_quality_id)
-                
-            if hasattr(self, 'drag_high_quality_id') and self.drag_high_quality_id:
-                self.root.after_cancel(self.drag_high_quality_id)
-            
-            # Schedule quality upgrades with delay
-            self.drag_fast_quality_id = self.root.after(50, lambda: self.resize_image(fast_mode=True))
+            # Coalesce motion events: at most one canvas update per frame
+            if not self.drag_frame_id:
+                self.drag_frame_id = self.root.after(16, self.apply_drag_frame)
 
     def on_drag_end(self, event):
-        """End the dragging operation but keep using fast rendering"""
+        """End the dragging operation and flush any pending movement"""
         self.is_dragging = False
+        if self.board:
+            self.board.on_drag_end(event)
+            return
+        if self.drag_frame_id:
+            self.root.after_cancel(self.drag_frame_id)
+            self.apply_drag_frame()
         
-        # No longer schedule high-quality rendering to maintain speed
-        # self.root.after(100, lambda: self.resize_image(fast_mode=False))
+        # Moving a preview around doesn't upgrade it, so make sure that happens now
+        if self.displayed_key and self.displayed_key[-1] != HIGH_QUALITY_RESAMPLE and not self.upgrade_after_id:
+            self.upgrade_after_id = self.root.after(UPGRADE_DELAY_MS, self.start_quality_upgrade)
+
+    def apply_drag_frame(self):
+        """Move the existing canvas item to the new pan offset, re-rendering only if needed"""
+        self.drag_frame_id = None
+        if not self.original_image or not self.image_id or not self.rendered_rect:
+            self.resize_image()
+            return
+        
+        # Translate the already rendered item instead of rasterising again
+        offset_x = self.pan_x - self.rendered_pan[0]
+        offset_y = self.pan_y - self.rendered_pan[1]
+        self.canvas.coords(self.image_id, self.rendered_rect[0] + offset_x, self.rendered_rect[1] + offset_y)
+        
+        # Re-render once the visible part of the image leaves the rendered area
+        canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if not view_covered(self.rendered_rect, self.rendered_pan, self.original_image.size, canvas_size,
+                            self.zoom_factor, self.pan_x, self.pan_y):
+            self.resize_image()
     
-    def resize_image(self, fast_mode=True, very_fast_mode=True):  # Changed defaults to True
-        """Resize image with quality level based on interaction state"""
+    def view_key(self, canvas_width, canvas_height):
+        """Everything about the current view that changes the rendered pixels"""
+        return (self.original_image_key, canvas_width, canvas_height, round(self.zoom_factor, 4),
+                self.pan_x, self.pan_y, self.filter_chain())
+
+    def resize_image(self):
+        """Show the current view: a fast preview now, a high quality render once idle"""
         if not self.original_image:
             return
         
@@ -394,101 +1109,114 @@ class AppUI:
         # Skip if canvas isn't properly sized yet
         if canvas_width <= 1 or canvas_height <= 1:
             return
-            
-        image_width, image_height = self.original_image.size
-        
-        # Use the zoom cache
-        img_id = id(self.original_image)
-        cache_key = f"{img_id}_{self.zoom_factor:.1f}"
-        
-        if cache_key in self.zoom_cache:
-            processed_image = self.zoom_cache[cache_key]
-            self.display_processed_image(processed_image)
+
+        if self.animation and self.animation.current is not None:
+            # Animations re-render their frames rather than the still image
+            self.animation.refresh()
             return
         
-        # Calculate scaling
-        base_scale = min(canvas_width / image_width, canvas_height / image_height)
-        scale = base_scale * self.zoom_factor
-        
-        new_width = int(image_width * scale)
-        new_height = int(image_height * scale)
+        # Whatever was being upgraded no longer matches the view
+        self.quality_renderer.cancel()
+        if self.upgrade_after_id:
+            self.root.after_cancel(self.upgrade_after_id)
+            self.upgrade_after_id = None
         
-        # Simple approach: always use NEAREST for all resize operations
-        resample_method = Image.NEAREST
-        temp_width, temp_height = new_width, new_height
+        view_key = self.view_key(canvas_width, canvas_height)
         
-        # Resize the image
-        resized_image = self.original_image.resize((temp_width, temp_height), resample_method)
-        
-        processed_image = self.process_image(resized_image)
+        # A finished high quality render of this exact view needs no preview
+        quality_key = view_key + (HIGH_QUALITY_RESAMPLE,)
+        cached = self.render_cache.get(quality_key)
+        if cached:
+            processed_image, position, photo = cached
+            self.display_processed_image(processed_image, position, photo, quality_key)
+            return
         
-        # Only cache high quality images
-        if not very_fast_mode and not fast_mode:
-            if len(self.zoom_cache) >= self.max_cache_entries:
-                self.zoom_cache.pop(next(iter(self.zoom_cache)))
-            self.zoom_cache[cache_key] = processed_image
+        preview_key = view_key + (PREVIEW_RESAMPLE,)
+        cached = self.render_cache.get(preview_key)
+        if cached:
+            processed_image, position, photo = cached
+            self.display_processed_image(processed_image, position, photo, preview_key)
+        else:
+            # Only the part of the image that is actually on the canvas gets resized
+            # Filters run once per image and chain (cached), so switching back and forth is instant
+            processed_image, position = render_view(self.original_pyramid, (canvas_width, canvas_height),
+                                                    self.zoom_factor, (self.pan_x, self.pan_y),
+                                                    self.filter_chain(), PREVIEW_RESAMPLE, margin=PAN_MARGIN,
+                                                    filter_cache=self.filter_cache,
+                                                    cache_key=self.original_image_key)
+            if processed_image is None:
+                # Panned completely out of view
+                if self.image_id:
+                    self.canvas.delete(self.image_id)
+                    self.image_id = None
+                self.rendered_rect = None
+                return
+            
+            self.render_cache.put(preview_key, processed_image, position)
+            self.display_processed_image(processed_image, position, cache_key=preview_key)
         
-        # Display the image
-        self.display_processed_image(processed_image)
+        self.upgrade_after_id = self.root.after(UPGRADE_DELAY_MS, self.start_quality_upgrade)
 
-    def display_processed_image(self, processed_image):
-        """Display a processed image on the canvas"""
-        self.image = ImageTk.PhotoImage(processed_image)
-        
-        if self.image_id:
-            self.canvas.delete(self.image_id)
+    def start_quality_upgrade(self):
+        """Render the current view with a high quality filter on the worker thread"""
+        self.upgrade_after_id = None
+        if not self.original_image or self.animation:
+            return
+        if self.is_dragging:
+            # Wait until the interaction is over
+            self.upgrade_after_id = self.root.after(UPGRADE_DELAY_MS, self.start_quality_upgrade)
+            return
         
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        center_x = canvas_width // 2 + self.pan_x
-        center_y = canvas_height // 2 + self.pan_y
+        canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        view_key = self.view_key(*canvas_size)
+        # Capture the view now; the job must not read UI state from the worker thread
+        pyramid, image_key, chain = self.original_pyramid, self.original_image_key, self.filter_chain()
+        zoom_factor, pan_x, pan_y = self.zoom_factor, self.pan_x, self.pan_y
+        filter_cache = self.filter_cache
         
-        self.image_id = self.canvas.create_image(center_x, center_y, anchor=tk.CENTER, image=self.image)
-
-    def precache_zoom_levels(self):
-        """Pre-cache all zoom preset levels for smoother zooming"""
-        if not self.original_image:
-            return
-            
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
+        def job():
+            rendered, position = render_view(pyramid, canvas_size, zoom_factor, (pan_x, pan_y),
+                                             chain, HIGH_QUALITY_RESAMPLE, margin=PAN_MARGIN,
+                                             filter_cache=filter_cache, cache_key=image_key)
+            if rendered is None:
+                return None
+            return rendered, position
         
-        # Skip if canvas isn't properly sized yet
-        if canvas_width <= 1 or canvas_height <= 1:
-            return
-            
-        image_width, image_height = self.original_image.size
+        def swap_in(result):
+            # Only show it if nothing changed while it was rendering
+            if result is None or self.animation or self.view_key(self.canvas.winfo_width(), self.canvas.winfo_height()) != view_key:
+                return
+            processed_image, position = result
+            quality_key = view_key + (HIGH_QUALITY_RESAMPLE,)
+            self.render_cache.put(quality_key, processed_image, position)
+            self.display_processed_image(processed_image, position, cache_key=quality_key)
         
-        # Calculate base scale once
-        base_scale = min(canvas_width / image_width, canvas_height / image_height)
+        self.quality_renderer.submit(job, swap_in)
+
+    def display_processed_image(self, processed_image, position, photo=None, cache_key=None):
+        """Display a processed image on the canvas with its top-left corner at position"""
+        if photo is None:
+            with instrumentation.span("ui.photoimage"):
+                photo = ImageTk.PhotoImage(processed_image)
+            if cache_key is not None:
+                self.render_cache.set_photo(cache_key, photo)
+        self.image = photo
+        self.displayed_key = cache_key
+        self.displayed_image = processed_image
+        self.displayed_position = position
+        self.place_canvas_image(self.image, position[0], position[1])
         
-        # Pre-cache images for all zoom presets (except 1.0 which will be cached on first display)
-        for zoom_level in self.zoom_presets[1:]:  # Skip 1.0 as it will be done immediately
-            scale = base_scale * zoom_level
-            new_width = int(image_width * scale)
-            new_height = int(image_height * scale)
-            
-            # Generate cache key
-            img_id = id(self.original_image)
-            cache_key = f"{img_id}_{zoom_level:.2f}"
-            
-            # Skip if already cached
-            if cache_key in self.zoom_cache:
-                continue
-                
-            # Resize with NEAREST for consistent appearance
-            resized_image = self.original_image.resize((new_width, new_height), Image.NEAREST)
-            processed_image = self.process_image(resized_image)
-            
-            # Cache the processed image
-            self.zoom_cache[cache_key] = processed_image
-            
-            print(f"Cached zoom level: {zoom_level:.2f}")
+        # Remember what was rendered so drags and resizes can move it instead of re-rendering
+        width, height = processed_image.size
+        self.rendered_rect = (position[0], position[1], position[0] + width, position[1] + height)
+        self.rendered_pan = (self.pan_x, self.pan_y)
+        self.rendered_canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
 
     def on_zoom_selected(self, event=None):
         """Handle zoom dropdown selection"""
         if not self.original_image:
             return
+        self.note_interaction()
             
         # Get the selected zoom level from the dropdown (remove % and convert to float)
         selected_zoom = self.zoom_var.get().rstrip('%')
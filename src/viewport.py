@@ -0,0 +1,76 @@
+import math
+from PIL import Image
+
+
+def fit_scale(image_size, canvas_size):
+    """Scale that fits the whole image inside the canvas (100% zoom)"""
+    image_width, image_height = image_size
+    canvas_width, canvas_height = canvas_size
+    return min(canvas_width / image_width, canvas_height / image_height)
+
+
+def visible_region(image_size, canvas_size, zoom_factor, pan_x, pan_y, margin=0):
+    """Work out which part of the source image is on screen.
+
+    Returns (source_box, dest_box, scale): source_box is the visible
+    rectangle in image pixels and dest_box where it lands on the canvas,
+    or None when the image is entirely off screen. A margin widens the
+    area around the canvas that counts as visible.
+    """
+    image_width, image_height = image_size
+    canvas_width, canvas_height = canvas_size
+    scale = fit_scale(image_size, canvas_size) * zoom_factor
+
+    # Where the whole scaled image would sit on the canvas (centered plus pan)
+    left = canvas_width / 2 + pan_x - image_width * scale / 2
+    top = canvas_height / 2 + pan_y - image_height * scale / 2
+
+    # Clip to the canvas (plus margin), snapping to whole canvas pixels
+    dest_left = max(-margin, math.floor(left))
+    dest_top = max(-margin, math.floor(top))
+    dest_right = min(canvas_width + margin, math.ceil(left + image_width * scale))
+    dest_bottom = min(canvas_height + margin, math.ceil(top + image_height * scale))
+    if dest_right <= dest_left or dest_bottom <= dest_top:
+        return None
+
+    # Map the clipped rectangle back to source pixels
+    source_box = (
+        max(0.0, (dest_left - left) / scale),
+        max(0.0, (dest_top - top) / scale),
+        min(float(image_width), (dest_right - left) / scale),
+        min(float(image_height), (dest_bottom - top) / scale),
+    )
+    return source_box, (dest_left, dest_top, dest_right, dest_bottom), scale
+
+
+def render_viewport(image, canvas_size, zoom_factor, pan_x, pan_y, resample=Image.NEAREST, margin=0):
+    """Crop and scale only the visible part of the image.
+
+    image can be a PIL image or an ImagePyramid. Cost is proportional to
+    the canvas area rather than to the zoomed image size. Returns (rendered_image, (x, y)) with the top-left canvas
+    position, or (None, None) when nothing is visible.
+    """
+    region = visible_region(image.size, canvas_size, zoom_factor, pan_x, pan_y, margin)
+    if region is None:
+        return None, None
+    source_box, dest_box, _ = region
+    dest_size = (dest_box[2] - dest_box[0], dest_box[3] - dest_box[1])
+    rendered = image.resize(dest_size, resample, box=source_box)
+    return rendered, (dest_box[0], dest_box[1])
+
+
+def covers(outer, inner):
+    """True if rectangle outer (x0, y0, x1, y1) fully contains rectangle inner"""
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
+def view_covered(rendered_rect, rendered_pan, image_size, canvas_size, zoom_factor, pan_x, pan_y):
+    """True if a render made at rendered_pan, moved to the current pan, still fills the view"""
+    region = visible_region(image_size, canvas_size, zoom_factor, pan_x, pan_y)
+    if region is None:
+        return True
+    offset_x = pan_x - rendered_pan[0]
+    offset_y = pan_y - rendered_pan[1]
+    x0, y0, x1, y1 = rendered_rect
+    return covers((x0 + offset_x, y0 + offset_y, x1 + offset_x, y1 + offset_y), region[1])